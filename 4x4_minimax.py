@@ -1,9 +1,12 @@
+import functools
 import pygame
 import sys
-import math
 
-# Initialize pygame
-pygame.init()
+from engine import analysis, bitboard, mcts, mnk, negamax, openings, search, tablebase
+from engine import check_winner, initial_state, player, result, terminal
+from engine.stats import SearchStats
+from engine.transposition import TranspositionTable
+from engine.worker import Ponderer, SearchWorker
 
 # Screen size and colors
 # Screen size and colors
@@ -14,6 +17,31 @@ CIRCLE_RADIUS = SQUARE_SIZE // 3
 CIRCLE_WIDTH = 15
 CROSS_WIDTH = 25
 SPACE = SQUARE_SIZE // 4
+AI_TIME_LIMIT = 0.5  # Seconds the AI may think per move
+FPS = 30  # Frame cap; the loop sleeps the rest of each frame
+AI_MOVE_EVENT = pygame.USEREVENT + 1  # Posted by the search thread when it finishes
+ANALYSIS_TIME_LIMIT = 3.0  # Seconds the analysis may take to value every move
+ANALYSIS_EVENT = pygame.USEREVENT + 2  # Posted by the analysis thread when it finishes
+
+# Search backends for boards without k: same arguments and results, pick one with run_game(backend=...)
+BACKENDS = {
+    "alphabeta": search.iterative_deepening,
+    "negamax": negamax.iterative_deepening,  # Principal variation search with aspiration windows
+    "mcts": mcts.uct,  # Monte Carlo tree search; plays 5x5 without solving it
+}
+AI_BACKEND = "alphabeta"  # negamax searches as deep, with slightly more nodes when solving
+PONDER = True  # Search the human's replies while they think (not with mcts, whose tree already keeps them)
+
+# Menu entries: label -> (rows, cols, k), k None meaning a full row, column or diagonal wins
+GAMES = {
+    "3x3 Game": (3, 3, None),
+    "4x4 Game": (4, 4, None),
+    "5x5 Game": (5, 5, None),
+    "7x7, 4 in a row": (7, 7, 4),
+    "9x9, 5 in a row": (9, 9, 5),
+}
+MENU_TOP = 110  # y of the first menu button
+MENU_STEP = 62  # Distance between menu buttons
 
 # Colors
 BG_COLOR = (28, 170, 156)
@@ -26,124 +54,97 @@ TEXT_COLOR = (255, 255, 255)
 BUTTON_COLOR = (70, 70, 70)
 BUTTON_HOVER_COLOR = (100, 100, 100)
 SHADOW_COLOR = (0, 0, 0, 100)  # Semi-transparent shadow color
-
-# Fonts
-FONT = pygame.font.Font(None, 40)
-MENU_FONT = pygame.font.Font(None, 60)
-
-# Fonts
-FONT = pygame.font.Font(None, 40)
-MENU_FONT = pygame.font.Font(None, 60)
-
-# Initialize screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Tic-Tac-Toe')
-
-def initial_state(rows, cols):
-    """Returns the initial state of the board."""
-    return [[None for _ in range(cols)] for _ in range(rows)]
-
-def player(state):
-    """Returns the player (X or O) whose turn it is."""
-    x_count = sum(row.count("X") for row in state)
-    o_count = sum(row.count("O") for row in state)
-    return "X" if x_count == o_count else "O"
-
-def actions(state):
-    """Returns the available legal moves in the current state."""
-    return [(i, j) for i in range(len(state)) for j in range(len(state[0])) if state[i][j] is None]
-
-def result(state, action):
-    """Returns the new state after taking action."""
-    i, j = action
-    if state[i][j] is not None:
-        raise ValueError("Invalid action")
-
-    new_state = [row[:] for row in state]  # Copy the state
-    new_state[i][j] = player(state)  # Place the current player's mark
-    return new_state
-
-def terminal(state):
-    """Checks if the game has ended (either a win or a draw)."""
-    return check_winner(state) is not None or not any(None in row for row in state)
-
-def check_winner(state):
-    """Returns the winner of the game, if any."""
-    rows, cols = len(state), len(state[0])
-    # Check rows
-    for row in state:
-        if row.count(row[0]) == len(row) and row[0] is not None:
-            return row[0]
-    # Check columns
-    for col in range(cols):
-        if all(state[row][col] == state[0][col] for row in range(rows)) and state[0][col] is not None:
-            return state[0][col]
-    # Check diagonals
-    if all(state[i][i] == state[0][0] for i in range(rows)) and state[0][0] is not None:
-        return state[0][0]
-    if all(state[i][cols - 1 - i] == state[0][cols - 1] for i in range(rows)) and state[0][cols - 1] is not None:
-        return state[0][cols - 1]
-    return None
-
-def utility(state):
-    """Returns the score of the state (1 if X wins, -1 if O wins, 0 if draw)."""
-    win = check_winner(state)
-    if win == "X":
-        return 1
-    elif win == "O":
-        return -1
-    else:
-        return 0
-
-def minimax(state, depth, is_maximizing, alpha, beta):
-    if terminal(state):
-        return utility(state), None
-
-    if is_maximizing:
-        best_value = -math.inf
-        best_move = None
-        for action in actions(state):
-            min_result, _ = minimax(result(state, action), depth + 1, False, alpha, beta)
-            if min_result > best_value:
-                best_value = min_result
-                best_move = action
-            alpha = max(alpha, best_value)
-            if beta <= alpha:  # Beta cut-off
-                break
-        return best_value, best_move
-    else:
-        best_value = math.inf
-        best_move = None
-        for action in actions(state):
-            max_result, _ = minimax(result(state, action), depth + 1, True, alpha, beta)
-            if max_result < best_value:
-                best_value = max_result
-                best_move = action
-            beta = min(beta, best_value)
-            if beta <= alpha:  # Alpha cut-off
-                break
-        return best_value, best_move
-def draw_lines(rows, cols):
+HEAT_COLORS = {1: (40, 200, 80, 180), 0: (240, 210, 80, 180), -1: (220, 50, 50, 180),  # Win, draw, loss
+               None: (150, 150, 150, 180)}  # Not resolved by a depth-limited analysis
+
+# Fonts and screen, created by init_display()
+FONT = None
+MENU_FONT = None
+STATS_FONT = None
+screen = None
+
+def init_display():
+    """Initializes pygame, loads the fonts and opens the window."""
+    global FONT, MENU_FONT, STATS_FONT, screen
+    pygame.init()
+    FONT = pygame.font.Font(None, 40)
+    MENU_FONT = pygame.font.Font(None, 60)
+    STATS_FONT = pygame.font.Font(None, 22)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Tic-Tac-Toe')
+
+def draw_lines(rows, cols, surface=None):
     """Draws the Tic-Tac-Toe board."""
-    screen.fill(BG_COLOR)
+    surface = surface or screen
+    surface.fill(BG_COLOR)
     # Draw horizontal lines
     for i in range(1, rows):
-        pygame.draw.line(screen, LINE_COLOR, (0, SQUARE_SIZE * i), (WIDTH, SQUARE_SIZE * i), LINE_WIDTH)
+        pygame.draw.line(surface, LINE_COLOR, (0, SQUARE_SIZE * i), (WIDTH, SQUARE_SIZE * i), LINE_WIDTH)
     # Draw vertical lines
     for j in range(1, cols):
-        pygame.draw.line(screen, LINE_COLOR, (SQUARE_SIZE * j, 0), (SQUARE_SIZE * j, HEIGHT - 100), LINE_WIDTH)
-
-def draw_figures(state):
-    """Draws X's and O's on the board."""
+        pygame.draw.line(surface, LINE_COLOR, (SQUARE_SIZE * j, 0), (SQUARE_SIZE * j, HEIGHT - 100), LINE_WIDTH)
+
+@functools.lru_cache(maxsize=None)
+def board_background(rows, cols, square_size):
+    """Returns the empty board drawn once on its own surface, to blit instead of redrawing it."""
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    draw_lines(rows, cols, surface)
+    return surface
+
+@functools.lru_cache(maxsize=512)
+def render_text(font, text, color):
+    """Renders text once; later calls with the same content reuse the surface."""
+    return font.render(text, True, color)
+
+@functools.lru_cache(maxsize=8)
+def heat_square(color, square_size):
+    """Returns a square of the translucent heatmap color, to blit over the board."""
+    surface = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+    surface.fill(color)
+    return surface
+
+def draw_heatmap(state, values, depth):
+    """Shades each empty square by the value of playing there, for the side to move.
+
+    values maps (row, col) to the move's value from X's point of view, as
+    analysis.analyse returns it, depth plies deep. Each square is labelled W
+    or L with the plies to the end of the game, or = for a draw. A 0 from an
+    analysis shallower than the empty squares left only means nothing was
+    found within the depth, so it is labelled ? instead.
+    """
+    sign = 1 if player(state) == "X" else -1
+    resolved = depth >= sum(row.count(None) for row in state)
+    for (row, col), value in values.items():
+        value *= sign
+        outcome = (value > 0) - (value < 0)
+        if not outcome and not resolved:
+            outcome = None
+        square = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        screen.blit(heat_square(HEAT_COLORS[outcome], SQUARE_SIZE), square)
+        if outcome is None:
+            label = "?"
+        else:
+            label = "=" if not outcome else f"{'W' if outcome > 0 else 'L'}{search.WIN - abs(value)}"
+        text_surface = render_text(STATS_FONT, label, TEXT_COLOR)
+        screen.blit(text_surface, text_surface.get_rect(center=square.center))
+
+def draw_figures(state, heat=None):
+    """Draws X's and O's on the board, over a heatmap if heat, the analysis's (values, depth), is given."""
+    if heat and heat[0]:
+        draw_heatmap(state, *heat)
     for row in range(len(state)):
         for col in range(len(state[0])):
-            if state[row][col] == "O":
-                pygame.draw.circle(screen, CIRCLE_COLOR, (int(col * SQUARE_SIZE + SQUARE_SIZE // 2), int(row * SQUARE_SIZE + SQUARE_SIZE // 2)), CIRCLE_RADIUS, CIRCLE_WIDTH)
-            elif state[row][col] == "X":
-                pygame.draw.line(screen, CROSS_COLOR, (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SQUARE_SIZE - SPACE),
-                                 (col * SQUARE_SIZE + SQUARE_SIZE - SPACE, row * SQUARE_SIZE + SPACE), CROSS_WIDTH)
-                pygame.draw.line(screen, CROSS_COLOR, (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SPACE),
-                                 (col * SQUARE_SIZE + SQUARE_SIZE - SPACE, row * SQUARE_SIZE + SQUARE_SIZE - SPACE), CROSS_WIDTH)
+            draw_figure(state, row, col)
+
+def draw_figure(state, row, col):
+    """Draws the mark in one square, if any."""
+    if state[row][col] == "O":
+        pygame.draw.circle(screen, CIRCLE_COLOR, (int(col * SQUARE_SIZE + SQUARE_SIZE // 2), int(row * SQUARE_SIZE + SQUARE_SIZE // 2)), CIRCLE_RADIUS, CIRCLE_WIDTH)
+    elif state[row][col] == "X":
+        pygame.draw.line(screen, CROSS_COLOR, (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SQUARE_SIZE - SPACE),
+                         (col * SQUARE_SIZE + SQUARE_SIZE - SPACE, row * SQUARE_SIZE + SPACE), CROSS_WIDTH)
+        pygame.draw.line(screen, CROSS_COLOR, (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SPACE),
+                         (col * SQUARE_SIZE + SQUARE_SIZE - SPACE, row * SQUARE_SIZE + SQUARE_SIZE - SPACE), CROSS_WIDTH)
 
 def draw_rounded_rect(surface, color, rect, radius):
     """Draws a rounded rectangle on the surface."""
@@ -151,6 +152,14 @@ def draw_rounded_rect(surface, color, rect, radius):
 
 def display_turn(turn):
     """Displays the current player's turn at the top of the screen with enhanced styling."""
+    display_message(f"Turn: {turn}")
+
+def display_thinking(progress):
+    """Shows that the AI is searching, with its progress so far."""
+    display_message(f"Thinking... depth {progress['depth']}, {progress['nodes'] // 1000}k")
+
+def display_message(text):
+    """Draws text in the styled status bar above the button."""
     # Define new colors
     shadow_color = (0, 0, 50, 100)  # Dark blue shadow
     bg_color = (173, 216, 230)  # Light blue background
@@ -165,7 +174,7 @@ def display_turn(turn):
     draw_rounded_rect(screen, bg_color, bg_rect, 15)  # Rounded rectangle background
 
     # Render text
-    text_surface = FONT.render(f"Turn: {turn}", True, text_color)
+    text_surface = render_text(FONT, text, text_color)
     text_rect = text_surface.get_rect(center=(WIDTH // 2, HEIGHT - 75))  # Center text
 
     # Blit text to screen
@@ -193,7 +202,7 @@ def draw_button():
     pygame.draw.rect(screen, border_color, button_rect, 2, border_radius=20)  # Draw border
 
     # Render text
-    text_surface = FONT.render("Minimax", True, TEXT_COLOR)
+    text_surface = render_text(FONT, "Minimax", TEXT_COLOR)
     text_rect = text_surface.get_rect(center=(WIDTH // 2, HEIGHT - 20))  # Center text
 
     # Blit text to screen
@@ -212,14 +221,11 @@ def button_clicked():
 def draw_menu():
     """Draws the main menu."""
     screen.fill(BG_COLOR)
-    title_surface = MENU_FONT.render("Tic-Tac-Toe", True, TEXT_COLOR)
+    title_surface = render_text(MENU_FONT, "Tic-Tac-Toe", TEXT_COLOR)
     screen.blit(title_surface, (WIDTH // 2 - 110, HEIGHT // 10))
 
-    # Increased button width from 150 to 200
-    draw_menu_button("3x3 Game", WIDTH // 2 - 100, HEIGHT // 3 - 30, 200, 50)
-    draw_menu_button("4x4 Game", WIDTH // 2 - 100, HEIGHT // 3 + 40, 200, 50)
-    draw_menu_button("5x5 Game", WIDTH // 2 - 100, HEIGHT // 3 + 110, 200, 50)
-    draw_menu_button("Quit", WIDTH // 2 - 100, HEIGHT // 3 + 180, 200, 50)
+    for n, label in enumerate(list(GAMES) + ["Quit"]):
+        draw_menu_button(label, WIDTH // 2 - 130, MENU_TOP + n * MENU_STEP, 260, 50)
 
 def draw_menu_button(text, x, y, width, height):
     """Draws a button in the main menu."""
@@ -230,7 +236,7 @@ def draw_menu_button(text, x, y, width, height):
         button_color = BUTTON_HOVER_COLOR
 
     pygame.draw.rect(screen, button_color, (x, y, width, height))
-    text_surface = FONT.render(text, True, TEXT_COLOR)
+    text_surface = render_text(FONT, text, TEXT_COLOR)
     screen.blit(text_surface, (x + 20, y + 10))
 
 def menu_button_clicked(x, y, width, height):
@@ -240,9 +246,11 @@ def menu_button_clicked(x, y, width, height):
 
 def main_menu():
     """Displays the main menu and handles navigation."""
+    clock = pygame.time.Clock()
     while True:
         draw_menu()
         pygame.display.update()
+        clock.tick(FPS)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -250,23 +258,28 @@ def main_menu():
                 sys.exit()
 
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if menu_button_clicked(WIDTH // 2 - 100, HEIGHT // 3 - 30, 200, 50):
-                    run_game(3, 3)  # Start 3x3 game
-                elif menu_button_clicked(WIDTH // 2 - 100, HEIGHT // 3 + 40, 200, 50):
-                    run_game(4, 4)  # Start 4x4 game
-                elif menu_button_clicked(WIDTH // 2 - 100, HEIGHT // 3 + 110, 200, 50):
-                    run_game(5, 5)  # Start 5x5 game
-                elif menu_button_clicked(WIDTH // 2 - 100, HEIGHT // 3 + 180, 200, 50):
+                for n, (rows, cols, k) in enumerate(GAMES.values()):
+                    if menu_button_clicked(WIDTH // 2 - 130, MENU_TOP + n * MENU_STEP, 260, 50):
+                        run_game(rows, cols, k)
+                if menu_button_clicked(WIDTH // 2 - 130, MENU_TOP + len(GAMES) * MENU_STEP, 260, 50):
                     pygame.quit()
                     sys.exit()
 
-def draw_winning_line(winner, state):
+def draw_winning_line(winner, state, k=None):
     """Draws a line for the winning player."""
     rows, cols = len(state), len(state[0])
     
     if winner is None:
         return
 
+    if k is not None:  # k in a row: join the centres of the first and last square
+        line = mnk.winning_line(state, k)
+        (start_row, start_col), (end_row, end_col) = line[0], line[-1]
+        start_pos = (start_col * SQUARE_SIZE + SQUARE_SIZE // 2, start_row * SQUARE_SIZE + SQUARE_SIZE // 2)
+        end_pos = (end_col * SQUARE_SIZE + SQUARE_SIZE // 2, end_row * SQUARE_SIZE + SQUARE_SIZE // 2)
+        pygame.draw.line(screen, WIN_COLOR, start_pos, end_pos, LINE_WIDTH - 10)
+        return
+
     # Check rows
     for row in range(rows):
         if state[row].count(state[row][0]) == cols and state[row][0] is not None:
@@ -296,12 +309,97 @@ def draw_winning_line(winner, state):
         pygame.draw.line(screen, WIN_COLOR, start_pos, end_pos, LINE_WIDTH - 10)
         return
 
-def run_game(rows, cols):
-    """Main loop for the Tic-Tac-Toe game."""
-    global SQUARE_SIZE
+def draw_stats_overlay(stats):
+    """Draws the counters of the last AI search over the board."""
+    overlay = pygame.Surface((WIDTH, HEIGHT - 100), pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 170))  # Semi-transparent so the board shows through
+    lines = stats.summary() if stats is not None else ["No search yet"]
+    for n, line in enumerate(lines):
+        text_surface = render_text(STATS_FONT, line, TEXT_COLOR)
+        overlay.blit(text_surface, (10, 10 + n * 22))
+    screen.blit(overlay, (0, 0))
+
+def start_ai(state, is_maximizing, table, k=None, backend=AI_BACKEND):
+    """Starts the AI search in the background; its move arrives as an AI_MOVE_EVENT."""
+    def post(value, move, depth):
+        pygame.event.post(pygame.event.Event(AI_MOVE_EVENT, worker=worker, move=move, value=value, depth=depth,
+                                             stats=worker.stats))
+
+    if k is None:
+        worker = SearchWorker(bitboard.from_lists(state), is_maximizing, table, AI_TIME_LIMIT, post,
+                              BACKENDS[backend])
+    else:  # Too big to solve: depth-limited search with the heuristic evaluation
+        worker = SearchWorker(mnk.MNKState.from_lists(state, k), is_maximizing, table, AI_TIME_LIMIT, post,
+                              mnk.iterative_deepening)
+    worker.start()
+    return worker
+
+def start_analysis(state, table):
+    """Starts valuing every move in the background; the values arrive as an ANALYSIS_EVENT."""
+    def post(values, move, depth):
+        pygame.event.post(pygame.event.Event(ANALYSIS_EVENT, worker=worker, values=values, depth=depth))
+
+    worker = SearchWorker(bitboard.from_lists(state), player(state) == "X", table, ANALYSIS_TIME_LIMIT, post,
+                          analysis.iterative_deepening)
+    worker.start()
+    return worker
+
+def start_ponder(state, is_maximizing, table, k=None, backend=AI_BACKEND):
+    """Starts searching the AI's answers to the human's replies; returns the Ponderer, or None."""
+    if not PONDER or (backend == "mcts" and k is None):
+        return None
+    if k is None:
+        ponderer = Ponderer(state, is_maximizing, table, AI_TIME_LIMIT, bitboard.from_lists, BACKENDS[backend])
+    else:
+        ponderer = Ponderer(state, is_maximizing, table, AI_TIME_LIMIT, lambda s: mnk.MNKState.from_lists(s, k),
+                            mnk.iterative_deepening)
+    ponderer.start()
+    return ponderer
+
+def run_game(rows, cols, k=None, backend=AI_BACKEND):
+    """Main loop for the Tic-Tac-Toe game; with k set, k in a row wins.
+
+    backend names the BACKENDS search the AI uses on boards without k.
+    Pressing h toggles the analysis heatmap (boards without k only).
+    """
+    global SQUARE_SIZE, CIRCLE_RADIUS, CIRCLE_WIDTH, CROSS_WIDTH, SPACE
     SQUARE_SIZE = WIDTH // cols
+    CIRCLE_RADIUS = SQUARE_SIZE // 3
+    CIRCLE_WIDTH = max(3, SQUARE_SIZE // 9)
+    CROSS_WIDTH = max(4, SQUARE_SIZE // 5)
+    SPACE = SQUARE_SIZE // 4
+    if k is None:
+        winner_of, game_ended = check_winner, terminal
+    else:
+        def winner_of(state):
+            return mnk.check_winner(state, k)
+
+        def game_ended(state):
+            return mnk.terminal(state, k)
     state = initial_state(rows, cols)
     game_over = False
+    # Kept for the whole game so each AI move reuses earlier work
+    table = mcts.Tree() if backend == "mcts" and k is None else TranspositionTable()  # k boards use mnk
+    worker = None  # Background search, if the AI is thinking
+    ponderer = None  # Background search of the human's replies, after an AI move
+    last_stats = None  # Counters of the last finished search
+    show_stats = False
+    analysing = False  # Heatmap of every move's value shown
+    analyser = None  # Background analysis of the current position
+    analysed = None  # (board, values, depth) of the last finished analysis
+    # The analysis shares the AI's table, except with mcts, whose "table" is its tree
+    analysis_table = table if isinstance(table, TranspositionTable) else TranspositionTable()
+
+    # Rendering state: what is on screen now, so each frame only redraws what changed
+    clock = pygame.time.Clock()
+    background = board_background(rows, cols, SQUARE_SIZE)
+    board_rect = pygame.Rect(0, 0, WIDTH, HEIGHT - 100)
+    status_rect = pygame.Rect(0, HEIGHT - 100, WIDTH, 52)  # Status bar and its shadow
+    button_rect = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 40, 150, 40)
+    drawn_state = None
+    drawn_board = drawn_status = drawn_button = None
+    screen.fill(BG_COLOR)
+    pygame.display.update()
 
     while True:
         for event in pygame.event.get():
@@ -309,7 +407,7 @@ def run_game(rows, cols):
                 pygame.quit()
                 sys.exit()
 
-            if event.type == pygame.MOUSEBUTTONDOWN and not game_over:
+            if event.type == pygame.MOUSEBUTTONDOWN and not game_over and worker is None:
                 mouse_x = event.pos[0]
                 mouse_y = event.pos[1]
                 clicked_row = mouse_y // SQUARE_SIZE
@@ -318,52 +416,177 @@ def run_game(rows, cols):
                 # Check if clicked_row and clicked_col are within bounds
                 if 0 <= clicked_row < rows and 0 <= clicked_col < cols:
                     if state[clicked_row][clicked_col] is None:
-                        state[clicked_row][clicked_col] = player(state)
+                        state = result(state, (clicked_row, clicked_col))
 
-                        if terminal(state):
+                        if game_ended(state):
                             game_over = True
 
             if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                run_game(rows, cols)  # Restart the game
+                if worker is not None:
+                    worker.cancel()
+                if ponderer is not None:
+                    ponderer.cancel()
+                if analyser is not None:
+                    analyser.cancel()
+                run_game(rows, cols, k, backend)  # Restart the game
+
+            # Toggle the search statistics overlay when 's' is pressed
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                show_stats = not show_stats
+
+            # Toggle the analysis heatmap when 'h' is pressed
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h and k is None:
+                analysing = not analysing
+                if not analysing and analyser is not None:
+                    analyser.cancel()
+                    analyser = None
+
+            # Cancel the AI search when Escape is pressed
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and worker is not None:
+                worker.cancel()
+                worker = None
+
+            ai_request = None  # Side the AI should play for, if asked to move
 
             # Handle AI move when 'a' is pressed
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_a:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_a and not game_over and worker is None:
                 if player(state) == "X":  # Only allow X to trigger AI
-                    ai_move = minimax(state, 0, True, -math.inf, math.inf)[1]
-                    if ai_move:
-                        state = result(state, ai_move)
-                        if terminal(state):
-                            game_over = True
+                    ai_request = True
 
             # Handle button click for AI Move
-            if event.type == pygame.MOUSEBUTTONDOWN and not game_over and button_clicked():
+            if event.type == pygame.MOUSEBUTTONDOWN and not game_over and worker is None and button_clicked():
                 if player(state) == "X":
-                    ai_move = minimax(state, 0, True, -math.inf, math.inf)[1]
-                    if ai_move:
-                        state = result(state, ai_move)
-                        if terminal(state):
-                            game_over = True
+                    ai_request = True
                 elif player(state) == "O":  # Allow O to also use the button
-                    ai_move = minimax(state, 0, False, -math.inf, math.inf)[1]  # Change to False for O
-                    if ai_move:
-                        state = result(state, ai_move)
-                        if terminal(state):
-                            game_over = True
-
-        screen.fill(BG_COLOR)
-        draw_lines(rows, cols)
-        draw_figures(state)
-        if not game_over:
-            display_turn(player(state))
-            draw_button()
+                    ai_request = False  # Change to False for O
+
+            if ai_request is not None:
+                if analyser is not None:  # The AI gets the CPU; the analysis restarts after its move
+                    analyser.cancel()
+                    analyser = None
+                book = tablebase.load(rows, cols) if k is None else None
+                drawing = book.drawing_move(bitboard.from_lists(state)) if book is not None else None
+                opening = openings.load(rows, cols) if k is None else None  # Opened on the first AI move
+                book_stats = SearchStats()
+                hit = opening.probe(bitboard.from_lists(state), book_stats) if opening is not None else None
+                pondered = None
+                if ponderer is not None:
+                    ponderer.cancel()
+                    if ponderer.is_maximizing == ai_request:
+                        pondered = ponderer.reply(state)
+                    ponderer = None
+                if drawing is not None:  # Drawn on a solved board size: look the move up instead of searching
+                    state = result(state, drawing)
+                    if game_ended(state):
+                        game_over = True
+                elif hit is not None:  # Searched deeply offline: play the book move
+                    last_stats = book_stats
+                    state = result(state, hit[1])
+                    if game_ended(state):
+                        game_over = True
+                    else:
+                        ponderer = start_ponder(state, ai_request, table, k, backend)
+                elif pondered is not None:  # Searched while the human was thinking: answer at once
+                    state = result(state, pondered[1])
+                    if game_ended(state):
+                        game_over = True
+                    else:
+                        ponderer = start_ponder(state, ai_request, table, k, backend)
+                else:  # Otherwise the search starts from whatever pondering left in the table
+                    worker = start_ai(state, ai_request, table, k, backend)
+
+            # The background search finished
+            if event.type == AI_MOVE_EVENT and event.worker is worker:
+                worker = None
+                last_stats = event.stats
+                if event.move:
+                    state = result(state, event.move)
+                    if game_ended(state):
+                        game_over = True
+                    else:
+                        ponderer = start_ponder(state, event.worker.is_maximizing, table, k, backend)
+
+            # The analysis finished
+            if event.type == ANALYSIS_EVENT and event.worker is analyser:
+                analyser = None
+                analysed = (event.worker.board, event.values, event.depth)
+
+        if game_over and ponderer is not None:  # Nothing left to ponder
+            ponderer.cancel()
+            ponderer = None
+
+        # Analyse each new position while the heatmap is on and the AI isn't thinking
+        board = bitboard.from_lists(state) if analysing else None
+        if analyser is not None and (game_over or analyser.board != board):
+            analyser.cancel()
+            analyser = None
+        if analysing and not game_over and worker is None and analyser is None and \
+                (analysed is None or analysed[0] != board):
+            analyser = start_analysis(state, analysis_table)
+        heat = analysed[1:] if analysing and not game_over and analysed is not None and analysed[0] == board else None
+
+        dirty = []  # Screen rectangles redrawn this frame
+
+        # Board: a whole redraw when the overlay or result changes, else just the squares that changed
+        board_key = (game_over, show_stats, last_stats if show_stats else None, heat)
+        if board_key != drawn_board or (show_stats and state != drawn_state):  # Marks can't go under the overlay
+            screen.blit(background, board_rect, board_rect)
+            draw_figures(state, heat)
+            if game_over:
+                winner = winner_of(state)
+                text = "Draw!" if winner is None else f"{winner} wins!"
+                text_surface = render_text(FONT, text, TEXT_COLOR)
+                screen.blit(text_surface, (WIDTH // 2 - 50, HEIGHT // 2 - 30))
+
+                draw_winning_line(winner, state, k)  # Draw the winning line
+            if show_stats:
+                draw_stats_overlay(last_stats)
+            dirty.append(board_rect)
         else:
-            winner = check_winner(state)
-            text = "Draw!" if winner is None else f"{winner} wins!"
-            text_surface = FONT.render(text, True, TEXT_COLOR)
-            screen.blit(text_surface, (WIDTH // 2 - 50, HEIGHT // 2 - 30))
-
-            draw_winning_line(winner, state)  # Draw the winning line
-        pygame.display.update()
+            for row in range(rows):
+                for col in range(cols):
+                    if state[row][col] != drawn_state[row][col]:
+                        square = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+                        screen.blit(background, square, square)
+                        draw_figure(state, row, col)
+                        dirty.append(square)
+        drawn_board = board_key
+        drawn_state = [row[:] for row in state]
+
+        # Status bar: redrawn when its text would change
+        if game_over:
+            status_key = None
+        elif worker is not None:
+            status_key = ("thinking", worker.progress["depth"], worker.progress["nodes"] // 1000)
+        elif analyser is not None:
+            status_key = ("analysing", analyser.progress["depth"])
+        else:
+            status_key = ("turn", player(state))
+        if status_key != drawn_status:
+            screen.fill(BG_COLOR, status_rect)
+            if status_key is not None:
+                if worker is not None:
+                    display_thinking(worker.progress)
+                elif analyser is not None:
+                    display_message(f"Analysing... depth {analyser.progress['depth']}")
+                else:
+                    display_turn(player(state))
+            dirty.append(status_rect)
+            drawn_status = status_key
+
+        # Button: redrawn when it appears, disappears or the hover state flips
+        button_key = None if game_over else button_rect.collidepoint(pygame.mouse.get_pos())
+        if button_key != drawn_button:
+            screen.fill(BG_COLOR, button_rect)
+            if button_key is not None:
+                draw_button()
+            dirty.append(button_rect)
+            drawn_button = button_key
+
+        if dirty:
+            pygame.display.update(dirty)
+        clock.tick(FPS)
 
 if __name__ == "__main__":
+    init_display()
     main_menu()
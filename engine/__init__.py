@@ -0,0 +1,7 @@
+"""Tic-Tac-Toe engine: game rules and AI search for every board size, without pygame.
+
+The list-of-lists rules are available at the top level; the faster
+representations and searches live in the submodules (bitboard, search,
+searchstate, symmetry, transposition, tablebase, parallel, worker).
+"""
+from .board import actions, alphabeta, check_winner, initial_state, minimax, player, result, terminal, utility
@@ -0,0 +1,157 @@
+"""Multi-PV analysis: the exact value of every legal move, not just the best one.
+
+    echo '{"id": 1, "board": "X...O....", "size": 3}' | python -m engine.analysis
+    python -m engine.analysis --input positions.jsonl --output values.jsonl --time 2
+
+Positions are read one JSON object per line, in the requests format of
+engine.server, and each answer is written as a line:
+
+    {"id": 1, "values": [[0, 1, -996], [0, 2, 0], ...], "best": [1, 1], "depth": 7}
+
+where each value is from X's point of view, as search.minimax returns it.
+The best move is searched first; its value bounds every other move (none
+can be better), so the rest are searched with only the other side of the
+window open and still come out exact. All moves share one transposition
+table, so the later ones mostly run into entries the earlier ones left,
+and mirror images of a move already searched take its value without a
+search.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+from . import bitboard, negamax, search, symmetry, threats
+from .server import parse_board
+from .transposition import TranspositionTable
+
+SEARCHES = {"alphabeta": search.minimax, "negamax": negamax.minimax}
+
+def analyse(board, table=None, depth=math.inf, deadline=None, stop=None, progress=None, stats=None,
+            search_fn=search.minimax):
+    """Returns {(row, col): value} for every legal move of board, from X's point of view.
+
+    search_fn is search.minimax or negamax.minimax; the other arguments are
+    passed on to it. With depth set the values are those of a search that
+    deep, and SearchTimeout is raised as search.minimax raises it.
+    """
+    x, o, rows, cols = board
+    is_maximizing = bitboard.player(board) == "X"
+    if table is None:
+        table = TranspositionTable()
+    options = dict(deadline=deadline, stop=stop, progress=progress, stats=stats)
+    best, _ = search_fn(board, is_maximizing, table, depth=depth, **options)
+
+    # Every move is searched as deep as the root search searched it: a forced block uses no depth
+    own, other = (x, o) if is_maximizing else (o, x)
+    child_depth = depth if threats.completing(other, own, bitboard.tables(rows, cols)[0]) else depth - 1
+    # No move scores better than the best, so that side of the window can be closed
+    alpha, beta = (-math.inf, best + 1) if is_maximizing else (best - 1, math.inf)
+
+    values = {}
+    same = symmetry.stabilizer(board)
+    for i, j in symmetry.unique_moves(board):
+        child = bitboard.result(board, (i, j))
+        if bitboard.terminal(child):
+            value = bitboard.utility(child) * (search.WIN - 1)
+        else:
+            # The child's win scores count from the child, one ply below the root
+            value = search.to_root(search_fn(child, not is_maximizing, table, search.to_node(alpha, 1),
+                                             search.to_node(beta, 1), child_depth, **options)[0], 1)
+            if not alpha < value < beta:  # A shallower search can beat a deeper root value; open the window
+                value = search.to_root(search_fn(child, not is_maximizing, table, depth=child_depth,
+                                                 **options)[0], 1)
+        bit = 1 << (i * cols + j)
+        for image in [bit] + [bit_map[bit] for bit_map in same]:
+            idx = image.bit_length() - 1
+            values[idx // cols, idx % cols] = value
+    return values
+
+def iterative_deepening(board, is_maximizing, table=None, time_limit=0.5, stop=None, progress=None,
+                        stats=None, search_fn=search.minimax):
+    """Analyses 1, 2, 3... plies deep, with the arguments of search.iterative_deepening.
+
+    Returns (values, best move, depth) from the deepest analysis that
+    finished, values being a dict as analyse() returns it; SearchWorker
+    passes them on as the value. is_maximizing is implied by the board and
+    only kept for the signature.
+    """
+    x, o, rows, cols = board
+    if bitboard.terminal(board):
+        return {}, None, 0
+    if table is None:
+        table = TranspositionTable()
+    deadline = time.perf_counter() + time_limit
+    remaining = rows * cols - (x | o).bit_count()
+    best = ({}, None, 0)
+    pick = max if bitboard.player(board) == "X" else min
+    for depth in range(1, remaining + 1):
+        try:
+            values = analyse(board, table, depth, deadline, stop, progress, stats, search_fn)
+        except search.SearchTimeout:
+            break
+        best = (values, pick(values, key=values.get), depth)
+        if stats is not None:
+            stats.depth = depth
+        if progress is not None:
+            progress["depth"] = depth
+            progress["move"] = best[1]
+        if all(abs(value) >= search.WIN - depth for value in values.values()):  # Every move is decided
+            break
+    return best
+
+def answer(line, time_limit=None, search_fn=search.minimax):
+    """Returns the answer to one input line, as a dict; bad lines get {"id": ..., "error": ...}.
+
+    Without time_limit the values are exact, however long that takes.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return {"id": None, "error": "invalid JSON"}
+    if not isinstance(request, dict):
+        return {"id": None, "error": "request must be a JSON object"}
+    response = {"id": request.get("id")}
+    try:
+        board = parse_board(request)
+    except ValueError as e:
+        response["error"] = str(e)
+        return response
+    table = TranspositionTable()
+    if time_limit is None:
+        values = analyse(board, table, search_fn=search_fn)
+        depth = board[2] * board[3] - (board[0] | board[1]).bit_count()
+    else:
+        values, _, depth = iterative_deepening(board, bitboard.player(board) == "X", table, time_limit,
+                                               search_fn=search_fn)
+    pick = max if bitboard.player(board) == "X" else min
+    response.update(values=[[i, j, value] for (i, j), value in sorted(values.items())],
+                    best=list(pick(values, key=values.get)) if values else None, depth=depth)
+    return response
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Value every legal move of each position (multi-PV).")
+    parser.add_argument("--input", help="JSON lines to read (default: stdin)")
+    parser.add_argument("--output", help="file to write the answers to (default: stdout)")
+    parser.add_argument("--time", type=float, help="seconds per position; values are then as deep as that allows "
+                                                   "(default: exact, however long it takes)")
+    parser.add_argument("--search", choices=list(SEARCHES), default="alphabeta")
+    args = parser.parse_args(argv)
+
+    source = open(args.input) if args.input else sys.stdin
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for line in source:
+            if not line.strip():
+                continue
+            out.write(json.dumps(answer(line, args.time, SEARCHES[args.search])) + "\n")
+            out.flush()
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            out.close()
+
+if __name__ == "__main__":
+    main()
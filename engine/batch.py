@@ -0,0 +1,83 @@
+"""NumPy batch evaluation of many boards at once, for offline analysis.
+
+Boards are an (N, rows, cols) int8 array holding 1 for X, -1 for O and 0
+for an empty square. Win detection sums each board's marks along every
+winning line (precomputed as index arrays), so a line is won when its sum
+equals its length. With k given, the lines are every k-square window, as
+in the k-in-a-row games of engine.mnk; without it, the full rows, columns
+and diagonals.
+"""
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("engine.batch needs NumPy: pip install numpy") from e
+
+from . import bitboard, mnk
+
+CHUNK = 1 << 16  # Boards per step, keeps the temporary arrays small
+
+_LINES = {}
+
+def line_indices(rows, cols, k=None):
+    """Returns the winning lines as index arrays into a flattened board, grouped by length."""
+    size = (rows, cols, k)
+    if size not in _LINES:
+        if k is None:
+            lines = [[idx for idx in range(rows * cols) if mask >> idx & 1] for mask in bitboard.tables(rows, cols)[0]]
+        else:
+            lines = mnk.windows(rows, cols, k)
+        groups = {}
+        for line in lines:
+            groups.setdefault(len(line), []).append(line)
+        _LINES[size] = [np.array(group, dtype=np.intp) for group in groups.values()]
+    return _LINES[size]
+
+def from_lists(states):
+    """Converts list-of-lists boards to the (N, rows, cols) int8 form."""
+    marks = {"X": 1, "O": -1, None: 0}
+    return np.array([[[marks[cell] for cell in row] for row in state] for state in states], dtype=np.int8)
+
+def winners(boards, k=None):
+    """Returns an (N,) int8 array: 1 where X has won, -1 where O has, 0 otherwise; k in a row wins if given."""
+    n, rows, cols = boards.shape
+    flat = boards.reshape(n, rows * cols)
+    out = np.zeros(n, dtype=np.int8)
+    for start in range(0, n, CHUNK):
+        chunk = flat[start:start + CHUNK]
+        x_won = np.zeros(len(chunk), dtype=bool)
+        o_won = np.zeros(len(chunk), dtype=bool)
+        for lines in line_indices(rows, cols, k):
+            sums = chunk[:, lines].sum(axis=2, dtype=np.int16)
+            x_won |= (sums == lines.shape[1]).any(axis=1)
+            o_won |= (sums == -lines.shape[1]).any(axis=1)
+        out[start:start + CHUNK] = x_won.astype(np.int8) - o_won.astype(np.int8)
+    return out
+
+def side_to_move(boards):
+    """Returns an (N,) int8 array: 1 where X is to move, -1 where O is."""
+    n = len(boards)
+    totals = boards.reshape(n, -1).sum(axis=1, dtype=np.int16)  # X count minus O count
+    return np.where(totals == 0, 1, -1).astype(np.int8)
+
+def evaluate(boards, k=None):
+    """Evaluates every board at once; with k set, k in a row wins.
+
+    Returns a dict with (N,) arrays "winner" (1, -1 or 0), "terminal" (bool),
+    "side_to_move" (1 or -1) and an (N, rows, cols) bool "legal" mask, which
+    is all False for finished games.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    winner = winners(boards, k)
+    empty = boards == 0
+    full = ~empty.reshape(len(boards), -1).any(axis=1)
+    terminal = (winner != 0) | full
+    return {
+        "winner": winner,
+        "terminal": terminal,
+        "side_to_move": side_to_move(boards),
+        "legal": empty & ~terminal[:, None, None],
+    }
+
+def utility(boards, k=None):
+    """Returns the score of each board (1 if X wins, -1 if O wins, 0 otherwise)."""
+    return winners(np.asarray(boards, dtype=np.int8), k)
@@ -0,0 +1,210 @@
+"""Reproducible search benchmark over fixed positions for every board size.
+
+    python -m engine.benchmark --output results.json
+    python -m engine.benchmark --baseline results.json
+
+Each engine is run on the opening, middlegame and near-end position of each
+size it can finish in reasonable time. The iterative engines stop after
+NODE_BUDGET nodes rather than on a clock, so their results don't depend on
+the machine or its load. For every run the suite records the value and move
+chosen, nodes searched (when the engine counts them), the depth reached
+(for the iterative engines), wall time, nodes per second and peak memory.
+Results are written as JSON or CSV, and --baseline compares them with an
+earlier run, exiting with status 1 when something got slower, searched more
+nodes, reached less deep or changed its value.
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+import tracemalloc
+
+from . import bitboard, board, negamax, search, searchstate, tablebase
+from .searchstate import CountingState
+from .transposition import TranspositionTable
+
+# (size, phase) -> moves played from the empty board
+POSITIONS = {
+    (3, "opening"): [],
+    (3, "middlegame"): [(1, 1), (0, 0), (2, 2)],
+    (3, "near-end"): [(1, 1), (0, 0), (2, 2), (0, 2), (0, 1)],
+    (4, "opening"): [],
+    (4, "middlegame"): [(0, 0), (1, 1), (2, 2), (3, 3), (0, 3), (3, 0)],
+    (4, "near-end"): [(0, 0), (1, 1), (2, 2), (3, 3), (0, 3), (3, 0), (1, 2), (2, 1), (0, 1), (1, 0)],
+    (5, "opening"): [],
+    (5, "middlegame"): [(2, 2), (0, 0), (1, 1), (3, 3), (0, 4), (4, 0), (1, 3), (3, 1)],
+    (5, "near-end"): [(2, 2), (0, 0), (1, 1), (3, 3), (0, 4), (4, 0), (1, 3), (3, 1),
+                      (0, 2), (4, 2), (2, 0), (2, 4), (1, 2), (3, 2)],
+}
+
+NODE_BUDGET = 50_000  # Nodes the iterative engines search before they stop (about 0.5s)
+
+class _Budget:
+    """Stop flag for the iterative searches: set once progress has counted NODE_BUDGET nodes."""
+
+    def __init__(self, progress):
+        self.progress = progress
+
+    def is_set(self):
+        return self.progress["nodes"] >= NODE_BUDGET
+
+def _run_searchstate(search_fn):
+    def run(state, is_maximizing):
+        s = CountingState.from_lists(state)
+        value, move = search_fn(s, is_maximizing)
+        return value, move, s.nodes + 1, None
+    return run
+
+def _run_bitboard(state, is_maximizing):
+    value, move = bitboard.minimax(bitboard.from_lists(state), is_maximizing)
+    return value, move, None, None
+
+def _run_search(search_fn):
+    def run(state, is_maximizing):
+        progress = {"nodes": 0}
+        value, move = search_fn(bitboard.from_lists(state), is_maximizing, TranspositionTable(), progress=progress)
+        return value, move, progress["nodes"], None
+    return run
+
+def _run_iterative(search_fn):
+    def run(state, is_maximizing):
+        progress = {"nodes": 0, "depth": 0, "move": None}
+        value, move, depth = search_fn(bitboard.from_lists(state), is_maximizing, TranspositionTable(), math.inf,
+                                       stop=_Budget(progress), progress=progress)
+        return value, move, progress["nodes"], depth
+    return run
+
+def _run_tablebase(state, is_maximizing):
+    book = tablebase.load(len(state), len(state[0]))
+    value, move = book.best_move(bitboard.from_lists(state))
+    return value, move, None, None
+
+# name -> (runner, most empty squares it is run on, sizes it supports)
+ENGINES = {
+    "minimax": (_run_searchstate(searchstate.minimax), 10, (3, 4, 5)),  # Exhaustive, moves made and undone in place
+    "alphabeta": (_run_searchstate(searchstate.alphabeta), 12, (3, 4, 5)),  # Plain alpha-beta on the same state
+    "bitboard": (_run_bitboard, 13, (3, 4, 5)),
+    "search": (_run_search(search.minimax), 16, (3, 4, 5)),
+    "iterative": (_run_iterative(search.iterative_deepening), 25, (3, 4, 5)),
+    "negamax": (_run_search(negamax.minimax), 16, (3, 4, 5)),  # PVS
+    "negamax-iterative": (_run_iterative(negamax.iterative_deepening), 25, (3, 4, 5)),  # PVS + aspiration
+    "tablebase": (_run_tablebase, 16, (3, 4)),
+}
+
+def position(size, phase):
+    """Returns the list-of-lists board for one benchmark position."""
+    state = board.initial_state(size, size)
+    for move in POSITIONS[(size, phase)]:
+        state = board.result(state, move)
+    return state
+
+def run(engines=None, sizes=(3, 4, 5), memory=True, repeat=1):
+    """Runs the benchmark and returns one result dict per (engine, position).
+
+    With repeat > 1 each position is timed that many times and the fastest
+    run is kept, which steadies the short timings.
+    """
+    results = []
+    for name in engines or ENGINES:
+        runner, max_empty, supported = ENGINES[name]
+        for (size, phase), moves in POSITIONS.items():
+            if size not in sizes or size not in supported:
+                continue
+            state = position(size, phase)
+            empty = size * size - len(moves)
+            if empty > max_empty or (name == "tablebase" and tablebase.load(size, size) is None):
+                continue
+            is_maximizing = board.player(state) == "X"
+
+            wall = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                value, move, nodes, depth = runner(state, is_maximizing)
+                elapsed = time.perf_counter() - start
+                wall = elapsed if wall is None else min(wall, elapsed)
+
+            peak = None
+            if memory:  # Measured in a second run, tracemalloc slows the search down
+                tracemalloc.start()
+                runner(state, is_maximizing)
+                peak = tracemalloc.get_traced_memory()[1] // 1024
+                tracemalloc.stop()
+
+            results.append({
+                "engine": name,
+                "size": size,
+                "phase": phase,
+                "empty": empty,
+                "value": value,
+                "move": list(move) if move else None,
+                "nodes": nodes,
+                "depth": depth,
+                "wall_s": round(wall, 6),
+                "nodes_per_s": round(nodes / wall) if nodes and wall else None,
+                "peak_kb": peak,
+            })
+    return results
+
+def compare(results, baseline, threshold=0.10, min_seconds=0.005):
+    """Prints each result against the baseline to stderr; returns the number of regressions.
+
+    A regression is a wall time more than threshold (and min_seconds) slower,
+    more nodes, a shallower depth or a different value for the same engine
+    and position.
+    """
+    old = {(r["engine"], r["size"], r["phase"]): r for r in baseline}
+    regressions = 0
+    for r in results:
+        b = old.get((r["engine"], r["size"], r["phase"]))
+        if b is None:
+            continue
+        notes = []
+        if r["value"] != b["value"]:
+            notes.append(f"VALUE {b['value']} -> {r['value']}")
+        if r["wall_s"] > b["wall_s"] * (1 + threshold) and r["wall_s"] - b["wall_s"] > min_seconds:
+            notes.append("SLOWER")
+        if b["nodes"] and r["nodes"] and r["nodes"] > b["nodes"]:
+            notes.append("MORE NODES")
+        if b.get("depth") and r["depth"] is not None and r["depth"] < b["depth"]:
+            notes.append("SHALLOWER")
+        regressions += bool(notes)
+        ratio = r["wall_s"] / b["wall_s"] if b["wall_s"] else float("inf")
+        print(f"{r['engine']:>10} {r['size']}x{r['size']} {r['phase']:<10} "
+              f"{b['wall_s']:.4f}s -> {r['wall_s']:.4f}s ({ratio:.2f}x) {' '.join(notes)}", file=sys.stderr)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Tic-Tac-Toe engines on fixed positions.")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), help="engines to run (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[3, 4, 5], help="board sizes to run")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output", help="file to write the results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    parser.add_argument("--repeat", type=int, default=1, help="time each position this many times, keep the best")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    args = parser.parse_args(argv)
+
+    results = run(args.engines, args.sizes, not args.no_memory, args.repeat)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    if args.format == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames=list(results[0]) if results else [])
+        writer.writeheader()
+        writer.writerows(results)
+    if args.output:
+        out.close()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Bitboard representation of the Tic-Tac-Toe board.
+
+A board is a tuple (x, o, rows, cols) where x and o are integer bitmasks:
+bit i * cols + j is set when square (i, j) holds that player's mark.
+"""
+import math
+
+def line_masks(rows, cols):
+    """Returns the win masks for a board: every full row, column and diagonal."""
+    masks = []
+    for i in range(rows):
+        masks.append(sum(1 << (i * cols + j) for j in range(cols)))
+    for j in range(cols):
+        masks.append(sum(1 << (i * cols + j) for i in range(rows)))
+    if rows == cols:
+        masks.append(sum(1 << (i * cols + i) for i in range(rows)))
+        masks.append(sum(1 << (i * cols + cols - 1 - i) for i in range(rows)))
+    return masks
+
+def cell_lines(rows, cols):
+    """Maps each square's bit to the win masks that pass through it."""
+    masks = line_masks(rows, cols)
+    return {1 << idx: [m for m in masks if m >> idx & 1] for idx in range(rows * cols)}
+
+# Precomputed tables for every size offered in the menu
+WIN_MASKS = {(n, n): line_masks(n, n) for n in (3, 4, 5)}
+CELL_LINES = {(n, n): cell_lines(n, n) for n in (3, 4, 5)}
+
+def tables(rows, cols):
+    """Returns (win masks, lines per square), building them for new sizes."""
+    size = (rows, cols)
+    if size not in WIN_MASKS:
+        WIN_MASKS[size] = line_masks(rows, cols)
+        CELL_LINES[size] = cell_lines(rows, cols)
+    return WIN_MASKS[size], CELL_LINES[size]
+
+def initial_state(rows, cols):
+    """Returns the empty board."""
+    return (0, 0, rows, cols)
+
+def from_lists(state):
+    """Converts a list-of-lists board into a bitboard."""
+    rows, cols = len(state), len(state[0])
+    x = o = 0
+    for i in range(rows):
+        for j in range(cols):
+            if state[i][j] == "X":
+                x |= 1 << (i * cols + j)
+            elif state[i][j] == "O":
+                o |= 1 << (i * cols + j)
+    return (x, o, rows, cols)
+
+def to_lists(board):
+    """Converts a bitboard back into the list-of-lists form used for drawing."""
+    x, o, rows, cols = board
+    state = [[None for _ in range(cols)] for _ in range(rows)]
+    for i in range(rows):
+        for j in range(cols):
+            bit = 1 << (i * cols + j)
+            if x & bit:
+                state[i][j] = "X"
+            elif o & bit:
+                state[i][j] = "O"
+    return state
+
+def player(board):
+    """Returns the player (X or O) whose turn it is."""
+    x, o, _, _ = board
+    return "X" if x.bit_count() == o.bit_count() else "O"
+
+def actions(board):
+    """Returns the available legal moves in the current state."""
+    x, o, rows, cols = board
+    empty = ((1 << (rows * cols)) - 1) & ~(x | o)
+    moves = []
+    while empty:
+        bit = empty & -empty
+        empty ^= bit
+        idx = bit.bit_length() - 1
+        moves.append((idx // cols, idx % cols))
+    return moves
+
+def result(board, action):
+    """Returns the new board after taking action."""
+    x, o, rows, cols = board
+    i, j = action
+    bit = 1 << (i * cols + j)
+    if (x | o) & bit:
+        raise ValueError("Invalid action")
+    if player(board) == "X":
+        return (x | bit, o, rows, cols)
+    return (x, o | bit, rows, cols)
+
+def check_winner(board):
+    """Returns the winner of the game, if any."""
+    x, o, rows, cols = board
+    for mask in tables(rows, cols)[0]:
+        if x & mask == mask:
+            return "X"
+        if o & mask == mask:
+            return "O"
+    return None
+
+def terminal(board):
+    """Checks if the game has ended (either a win or a draw)."""
+    x, o, rows, cols = board
+    return check_winner(board) is not None or (x | o) == (1 << (rows * cols)) - 1
+
+def utility(board):
+    """Returns the score of the board (1 if X wins, -1 if O wins, 0 if draw)."""
+    win = check_winner(board)
+    if win == "X":
+        return 1
+    elif win == "O":
+        return -1
+    else:
+        return 0
+
+def minimax(board, is_maximizing, alpha=-math.inf, beta=math.inf):
+    """Alpha-beta minimax on a bitboard; returns (value, (row, col))."""
+    x, o, rows, cols = board
+    if terminal(board):
+        return utility(board), None
+    empty = ((1 << (rows * cols)) - 1) & ~(x | o)
+    value, bit = _minimax(x, o, empty, tables(rows, cols)[1], is_maximizing, alpha, beta)
+    idx = bit.bit_length() - 1
+    return value, (idx // cols, idx % cols)
+
+def _minimax(x, o, empty, lines, is_maximizing, alpha, beta):
+    """Search core: only the lines through the square just played are checked for a win."""
+    if not empty:
+        return 0, None
+
+    moves = empty
+    best_bit = None
+    if is_maximizing:
+        best_value = -math.inf
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            nx = x | bit
+            for mask in lines[bit]:
+                if nx & mask == mask:
+                    value = 1
+                    break
+            else:
+                value, _ = _minimax(nx, o, empty ^ bit, lines, False, alpha, beta)
+            if value > best_value:
+                best_value = value
+                best_bit = bit
+            alpha = max(alpha, best_value)
+            if beta <= alpha:  # Beta cut-off
+                break
+    else:
+        best_value = math.inf
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            no = o | bit
+            for mask in lines[bit]:
+                if no & mask == mask:
+                    value = -1
+                    break
+            else:
+                value, _ = _minimax(x, no, empty ^ bit, lines, True, alpha, beta)
+            if value < best_value:
+                best_value = value
+                best_bit = bit
+            beta = min(beta, best_value)
+            if beta <= alpha:  # Alpha cut-off
+                break
+    return best_value, best_bit
@@ -0,0 +1,77 @@
+"""Tic-Tac-Toe rules on the list-of-lists board used by the GUI.
+
+A board is a list of rows holding "X", "O" or None. Any square size works;
+a player wins by filling a whole row, column or diagonal.
+"""
+import math
+
+from . import searchstate
+from .searchstate import SearchState
+
+def initial_state(rows=3, cols=3):
+    """Returns the initial state of the board."""
+    return [[None for _ in range(cols)] for _ in range(rows)]
+
+def player(state):
+    """Returns the player (X or O) whose turn it is."""
+    x_count = sum(row.count("X") for row in state)
+    o_count = sum(row.count("O") for row in state)
+    return "X" if x_count == o_count else "O"
+
+def actions(state):
+    """Returns the available legal moves in the current state."""
+    return [(i, j) for i in range(len(state)) for j in range(len(state[0])) if state[i][j] is None]
+
+def result(state, action):
+    """Returns the new state after taking action."""
+    i, j = action
+    if state[i][j] is not None:
+        raise ValueError("Invalid action")
+
+    new_state = [row[:] for row in state]  # Copy the state
+    new_state[i][j] = player(state)  # Place the current player's mark
+    return new_state
+
+def terminal(state):
+    """Checks if the game has ended (either a win or a draw)."""
+    return check_winner(state) is not None or not any(None in row for row in state)
+
+def check_winner(state):
+    """Returns the winner of the game, if any."""
+    rows, cols = len(state), len(state[0])
+    # Check rows
+    for row in state:
+        if row.count(row[0]) == len(row) and row[0] is not None:
+            return row[0]
+    # Check columns
+    for col in range(cols):
+        if all(state[row][col] == state[0][col] for row in range(rows)) and state[0][col] is not None:
+            return state[0][col]
+    # Check diagonals
+    if all(state[i][i] == state[0][0] for i in range(rows)) and state[0][0] is not None:
+        return state[0][0]
+    if all(state[i][cols - 1 - i] == state[0][cols - 1] for i in range(rows)) and state[0][cols - 1] is not None:
+        return state[0][cols - 1]
+    return None
+
+def utility(state):
+    """Returns the score of the state (1 if X wins, -1 if O wins, 0 if draw)."""
+    win = check_winner(state)
+    if win == "X":
+        return 1
+    elif win == "O":
+        return -1
+    else:
+        return 0
+
+def minimax(state, is_maximizing):
+    """Exhaustive minimax; returns (value, (row, col)).
+
+    Runs on a SearchState that makes and undoes moves in place, so no board
+    is copied and no marks are recounted per node.
+    """
+    return searchstate.minimax(SearchState.from_lists(state), is_maximizing)
+
+def alphabeta(state, is_maximizing, alpha=-math.inf, beta=math.inf):
+    """Alpha-beta minimax; returns the same (value, (row, col)) as minimax, faster."""
+    return searchstate.alphabeta(SearchState.from_lists(state), is_maximizing, alpha, beta)
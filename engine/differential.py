@@ -0,0 +1,315 @@
+"""Differential testing: every optimized search against a plain exhaustive minimax.
+
+    python -m engine.differential                       # fast: a few hundred positions, for every change
+    python -m engine.differential --soak --time 3600    # every 3x3 position, then samples on all cores
+
+Positions are sampled by random play on 3x3, 4x4 and 5x5 boards, stopped
+with few enough empty squares left for the reference to solve them; the
+soak mode also goes through every reachable 3x3 position. The reference
+plays on the list-of-lists rules of engine.board, copying the board for
+every move, so it shares nothing with the engines it checks. Each backend
+must give the reference's value and a move the reference values the same,
+so any optimal move passes, not just the one the reference picks. Backends
+that score wins by distance (search.WIN less the plies to the win) must
+get the distance right too, so a slower win fails; for the others only
+win, draw or loss counts. A failing position is shrunk by taking marks
+off while the backend still fails, and both are printed in the board
+format of engine.server. The exit status is 1 when anything failed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import analysis, bitboard, board, negamax, parallel, search, tablebase
+
+TIME_LIMIT = 60.0  # For the iterative searches: long enough to finish every position sampled here
+
+def _run_board(search_fn):
+    def run(position, is_maximizing):
+        value, move = search_fn(bitboard.to_lists(position), is_maximizing)
+        return value, move, None
+    return run
+
+def _run_bitboard(position, is_maximizing):
+    value, move = bitboard.minimax(position, is_maximizing)
+    return value, move, None
+
+def _run_search(search_fn):
+    def run(position, is_maximizing):
+        value, move = search_fn(position, is_maximizing)
+        return value, move, None
+    return run
+
+def _run_iterative(search_fn):
+    def run(position, is_maximizing):
+        value, move, _ = search_fn(position, is_maximizing, time_limit=TIME_LIMIT)
+        return value, move, None
+    return run
+
+def _run_parallel(position, is_maximizing):
+    value, move = parallel.parallel_minimax(position, is_maximizing, workers=2)
+    return value, move, None
+
+def _run_analysis(position, is_maximizing):
+    values = analysis.analyse(position)
+    move = (max if is_maximizing else min)(values, key=values.get)
+    return values[move], move, values
+
+def _run_tablebase(position, is_maximizing):
+    book = tablebase.load(position[2], position[3])
+    if book is None:  # Not built for this size
+        return None
+    return book.best_move(position) + (None,)
+
+# name -> (runner, sizes it supports, whether it scores wins by distance);
+# a runner returns (value, (row, col), {move: value} or None)
+BACKENDS = {
+    "minimax": (_run_board(board.minimax), (3, 4, 5), False),  # SearchState: moves made and undone in place
+    "alphabeta": (_run_board(board.alphabeta), (3, 4, 5), False),  # The same, with alpha-beta
+    "bitboard": (_run_bitboard, (3, 4, 5), False),
+    "search": (_run_search(search.minimax), (3, 4, 5), True),
+    "iterative": (_run_iterative(search.iterative_deepening), (3, 4, 5), True),
+    "negamax": (_run_search(negamax.minimax), (3, 4, 5), True),
+    "negamax-iterative": (_run_iterative(negamax.iterative_deepening), (3, 4, 5), True),
+    "analysis": (_run_analysis, (3, 4, 5), True),
+    "parallel": (_run_parallel, (3, 4, 5), True),
+    "tablebase": (_run_tablebase, (3, 4), False),
+}
+SLOW = ("parallel",)  # Start a process pool per position, so only the soak runs them by default
+
+# size -> (positions sampled in the fast mode, fewest and most empty squares)
+FAST_SAMPLES = {3: (200, 1, 9), 4: (40, 3, 8), 5: (20, 3, 7)}
+# size -> (fewest, most empty squares) of the soak's samples; one more square is about 10 times slower
+SOAK_SAMPLES = {4: (3, 10), 5: (3, 9)}
+
+class Reference:
+    """Exact scores from exhaustive minimax on the list-of-lists rules, remembered per position.
+
+    Every move copies the board (board.result) and every position is judged
+    from scratch (board.terminal, board.utility): slow, but nothing in it is
+    shared with the engines under test. Scores are on search.minimax's
+    scale: search.WIN less the plies to the win for X, the negation for O,
+    0 for a draw.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def __call__(self, position):
+        """Returns the score of a bitboard position."""
+        return self.score(bitboard.to_lists(position))
+
+    def score(self, state):
+        """Returns the score of a list-of-lists board."""
+        key = tuple(map(tuple, state))
+        if key not in self.values:
+            if board.terminal(state):
+                value = board.utility(state) * search.WIN
+            else:
+                scores = [_earlier(self.score(board.result(state, move))) for move in board.actions(state)]
+                value = max(scores) if board.player(state) == "X" else min(scores)
+            self.values[key] = value
+        return self.values[key]
+
+def _earlier(score):
+    """Returns the score one ply before: a win or loss is one ply further off."""
+    return score - 1 if score > 0 else score + 1 if score < 0 else 0
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+def check(name, position, reference):
+    """Runs one backend on a non-terminal position; returns what it got wrong, or None if nothing."""
+    run, sizes, scaled = BACKENDS[name]
+    if position[2] != position[3] or position[2] not in sizes:
+        return None
+    is_maximizing = bitboard.player(position) == "X"
+    try:
+        outcome = run(position, is_maximizing)
+    except Exception as e:
+        return f"raised {e!r}"
+    if outcome is None:
+        return None
+    value, move, values = outcome
+
+    def expect(score):  # What the backend should give for a reference score
+        return score if scaled else _sign(score)
+
+    def worth(move):  # The reference score of playing move, for the position before it
+        return expect(_earlier(reference(bitboard.result(position, move))))
+
+    expected = expect(reference(position))
+    if value != expected:
+        return f"value {value}, expected {expected}"
+    if move not in bitboard.actions(position):
+        return f"illegal move {move}"
+    if worth(move) != expected:
+        return f"move {move} is worth {worth(move)}, not {expected}"
+    for other, other_value in sorted((values or {}).items()):
+        if other_value != worth(other):
+            return f"move {other} valued {other_value}, expected {worth(other)}"
+    return None
+
+def _smaller(position):
+    """Yields the non-terminal positions with one mark less, or one of each less, that keep the move order legal."""
+    x, o, rows, cols = position
+    o_last = x.bit_count() == o.bit_count()
+    last, first = (o, x) if o_last else (x, o)
+    singles = []
+    bits = last
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        singles.append(bit)
+    for bit in singles:  # Take back the last mover's mark
+        smaller = (x, o & ~bit, rows, cols) if o_last else (x & ~bit, o, rows, cols)
+        if not bitboard.terminal(smaller):
+            yield smaller
+    bits = first
+    while bits:  # Take back one mark of each side
+        other = bits & -bits
+        bits ^= other
+        for bit in singles:
+            smaller = (x & ~(bit | other), o & ~(bit | other), rows, cols)
+            if not bitboard.terminal(smaller):
+                yield smaller
+
+def shrink(name, position, problem, reference):
+    """Takes marks off a position name fails on while it keeps failing; returns (smallest, what went wrong)."""
+    shrinking = True
+    while shrinking:
+        shrinking = False
+        for smaller in _smaller(position):
+            smaller_problem = check(name, smaller, reference)
+            if smaller_problem is not None:
+                position, problem = smaller, smaller_problem
+                shrinking = True
+                break
+    return position, problem
+
+def all_positions(rows, cols):
+    """Returns every reachable non-terminal position, fewest marks first."""
+    layer = [bitboard.initial_state(rows, cols)]
+    found = list(layer)
+    while layer:
+        following = set()
+        for position in layer:
+            for move in bitboard.actions(position):
+                child = bitboard.result(position, move)
+                if not bitboard.terminal(child):
+                    following.add(child)
+        layer = sorted(following)
+        found += layer
+    return found
+
+def sample(rows, cols, empty, rng):
+    """Returns a non-terminal position with empty squares left, reached by random play."""
+    while True:
+        position = bitboard.initial_state(rows, cols)
+        while not bitboard.terminal(position) and rows * cols - (position[0] | position[1]).bit_count() > empty:
+            position = bitboard.result(position, rng.choice(bitboard.actions(position)))
+        if not bitboard.terminal(position):
+            return position
+
+def text(position):
+    """Returns the position as the board string engine.server reads: X, O and . row by row."""
+    return "".join(cell or "." for row in bitboard.to_lists(position) for cell in row)
+
+# Set in each worker process by _init_worker
+_REFERENCE = None
+_NAMES = None
+
+def _init_worker(names):
+    global _REFERENCE, _NAMES
+    _REFERENCE = Reference()
+    _NAMES = names
+
+def _check_position(position):
+    """Checks every backend on one position; returns (name, position, problem, smallest, its problem) per failure."""
+    failures = []
+    for name in _NAMES:
+        problem = check(name, position, _REFERENCE)
+        if problem is not None:
+            failures.append((name, position, problem) + shrink(name, position, problem, _REFERENCE))
+    if len(_REFERENCE.values) > 1_000_000:  # The soak would otherwise keep every position it ever solved
+        _REFERENCE.values.clear()
+    return failures
+
+def run(positions, names, workers=1):
+    """Checks names on every position, on workers processes; yields the failures as _check_position lists them."""
+    if workers == 1:
+        _init_worker(names)
+        results = map(_check_position, positions)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(names,))
+        results = pool.map(_check_position, positions, chunksize=4)
+    try:
+        for failures in results:
+            yield from failures
+    finally:
+        if workers != 1:
+            pool.shutdown(cancel_futures=True)
+
+def report(failures, out=sys.stdout):
+    """Writes one failure per line, with the shrunk counterexample; returns how many there were."""
+    count = 0
+    for name, position, problem, smallest, smallest_problem in failures:
+        count += 1
+        size = position[2]
+        out.write(f"FAIL {name} {size}x{size} {text(position)}: {problem}\n"
+                  f"     smallest {text(smallest)}: {smallest_problem}\n")
+        out.flush()
+    return count
+
+def fast(names, seed=0, workers=1):
+    """The quick check: FAST_SAMPLES positions of each size; returns (positions checked, failures)."""
+    rng = random.Random(seed)
+    positions = []
+    for size, (count, fewest, most) in FAST_SAMPLES.items():
+        positions += [sample(size, size, rng.randint(fewest, most), rng) for _ in range(count)]
+    return len(positions), report(run(positions, names, workers))
+
+def soak(names, seed=0, workers=None, duration=None):
+    """Every 3x3 position, then batches of SOAK_SAMPLES until duration seconds pass; returns (checked, failures)."""
+    workers = workers or os.cpu_count()
+    deadline = None if duration is None else time.perf_counter() + duration
+    rng = random.Random(seed)
+    positions = all_positions(3, 3)
+    checked = failed = 0
+    try:
+        while deadline is None or time.perf_counter() < deadline:
+            failed += report(run(positions, names, workers))
+            checked += len(positions)
+            print(f"{checked:,} positions checked, {failed} failures", file=sys.stderr)
+            positions = []
+            for size, (fewest, most) in SOAK_SAMPLES.items():
+                positions += [sample(size, size, rng.randint(fewest, most), rng) for _ in range(16 * workers)]
+    except KeyboardInterrupt:
+        pass
+    return checked, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the optimized searches against the exhaustive minimax.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS),
+                        help="backends to check (default: all, but parallel only with --soak)")
+    parser.add_argument("--soak", action="store_true", help="keep checking new positions on every core")
+    parser.add_argument("--time", type=float, help="seconds the soak runs for (default: until interrupted)")
+    parser.add_argument("--workers", type=int, help="processes (default: 1, or all cores with --soak)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = args.backends or [name for name in BACKENDS if args.soak or name not in SLOW]
+    start = time.perf_counter()
+    if args.soak:
+        checked, failed = soak(names, args.seed, args.workers, args.time)
+    else:
+        checked, failed = fast(names, args.seed, args.workers or 1)
+    print(f"{checked:,} positions, {len(names)} backends: {failed} failures in {time.perf_counter() - start:.1f}s")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Load generator for engine.server: many concurrent clients, latency and throughput.
+
+    python -m engine.loadgen --port 8765 --connections 16 --requests 2000 --size 4
+    python -m engine.loadgen --unix /tmp/tictactoe.sock --size 3 --plies 6
+
+Each connection sends random legal positions (seeded, so runs repeat) one
+after another and times every answer. At the end the p50/p99 latency,
+the throughput, the error counts and the server's own counters are printed.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from . import bitboard
+
+def random_position(rng, size, plies):
+    """Returns a random non-terminal board string after up to plies random moves."""
+    while True:
+        board = bitboard.initial_state(size, size)
+        for _ in range(rng.randint(0, plies)):
+            board = bitboard.result(board, rng.choice(bitboard.actions(board)))
+            if bitboard.terminal(board):
+                break
+        if not bitboard.terminal(board):
+            state = bitboard.to_lists(board)
+            return "".join(cell or "." for row in state for cell in row)
+
+async def connect(host, port, unix):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+async def client(host, port, unix, requests, latencies, errors):
+    """Sends each request in turn on one connection, recording latencies and errors."""
+    reader, writer = await connect(host, port, unix)
+    try:
+        for request in requests:
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if "error" in response:
+                errors[response["error"]] = errors.get(response["error"], 0) + 1
+    finally:
+        writer.close()
+
+async def server_stats(host, port, unix):
+    reader, writer = await connect(host, port, unix)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+def percentile(values, p):
+    """Returns the p-th percentile (0-100) of values, by the nearest-rank method."""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))]
+
+async def run(host="127.0.0.1", port=8765, unix=None, connections=8, requests=1000, size=3, plies=4,
+              deadline_ms=2000, seed=0):
+    """Runs the load test; returns a dict of results."""
+    rng = random.Random(seed)
+    batches = [[] for _ in range(connections)]
+    for n in range(requests):
+        batches[n % connections].append({"id": n, "board": random_position(rng, size, plies), "size": size,
+                                         "deadline_ms": deadline_ms})
+    latencies, errors = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, unix, batch, latencies, errors) for batch in batches))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+        "server": await server_stats(host, port, unix),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running engine.server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--connections", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="requests in total")
+    parser.add_argument("--size", type=int, default=3, help="board size")
+    parser.add_argument("--plies", type=int, default=4, help="most random moves in a position")
+    parser.add_argument("--deadline-ms", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.host, args.port, args.unix, args.connections, args.requests, args.size,
+                              args.plies, args.deadline_ms, args.seed))
+    print(f"{results['requests']} requests in {results['elapsed_s']}s: {results['throughput_rps']} req/s, "
+          f"p50 {results['p50_ms']} ms, p99 {results['p99_ms']} ms")
+    if results["errors"]:
+        print("errors:", ", ".join(f"{error} x{count}" for error, count in results["errors"].items()))
+    server = results["server"]
+    print("server:", ", ".join(f"{key} {value}" for key, value in server.items() if key != "id"))
+
+if __name__ == "__main__":
+    main()
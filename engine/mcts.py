@@ -0,0 +1,297 @@
+"""Monte Carlo tree search (UCT) on bitboards, for boards too big to solve.
+
+Each playout walks down the tree choosing children by the UCB1 formula,
+adds one new node, finishes the game with random moves and credits the
+result to every node it passed. The search is anytime: it stops after a
+time limit or a number of playouts, and the most visited root move is
+played. A Tree keeps its nodes between moves, so when the game reaches a
+position the tree already explored, that subtree carries on. With workers
+> 1 extra processes grow their own trees from the root (root
+parallelisation) and their root counts are added to the main tree's.
+"""
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+from . import mnk
+from .stats import log_stats
+
+EXPLORATION = math.sqrt(2)  # UCB1 constant
+
+_LINES = {}
+
+def cell_lines(rows, cols, k=None):
+    """Maps each square's bit to the win masks through it: full lines, or every k-window."""
+    size = (rows, cols, k)
+    if size not in _LINES:
+        if k is None:
+            _LINES[size] = bitboard.tables(rows, cols)[1]
+        else:
+            masks = [sum(1 << cell for cell in window) for window in mnk.windows(rows, cols, k)]
+            _LINES[size] = {1 << idx: [m for m in masks if m >> idx & 1] for idx in range(rows * cols)}
+    return _LINES[size]
+
+class Node:
+    """A position in the tree, reached by move (a bit) played by mover ("X" or "O")."""
+
+    __slots__ = ("x", "o", "move", "mover", "winner", "parent", "children", "untried", "visits", "score")
+
+    def __init__(self, x, o, move, mover, winner, parent, empty):
+        self.x = x
+        self.o = o
+        self.move = move
+        self.mover = mover
+        self.winner = winner  # "X", "O", "draw" or None while the game goes on
+        self.parent = parent
+        self.children = []
+        self.untried = [] if winner else _bits(empty)
+        self.visits = 0
+        self.score = 0.0  # Sum of results for mover: 1 a win, 0.5 a draw
+
+def _bits(mask):
+    """Returns the set bits of mask, lowest first."""
+    bits = []
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        bits.append(bit)
+    return bits
+
+def _winner(x, o, bit, mover, empty, lines):
+    """Returns the game result after mover played bit."""
+    own = x if mover == "X" else o
+    for mask in lines[bit]:
+        if own & mask == mask:
+            return mover
+    return None if empty else "draw"
+
+def _new_root(board, lines):
+    x, o, rows, cols = board
+    empty = ((1 << (rows * cols)) - 1) & ~(x | o)
+    mover = "O" if x.bit_count() == o.bit_count() else "X"  # The side that made the last move
+    winner = None if empty else "draw"
+    for masks in lines.values():
+        for mask in masks:
+            if x & mask == mask:
+                winner = "X"
+            elif o & mask == mask:
+                winner = "O"
+    return Node(x, o, None, mover, winner, None, empty)
+
+def playouts(root, lines, full, deadline=None, limit=None, rng=random, stop=None, progress=None):
+    """Runs playouts from root until deadline, limit playouts or stop; returns how many ran."""
+    log = math.log
+    sqrt = math.sqrt
+    count = reported = 0
+    while limit is None or count < limit:
+        if count & 63 == 0 and count:
+            if progress is not None:
+                progress["nodes"] += count - reported
+                reported = count
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if stop is not None and stop.is_set():
+                break
+        count += 1
+
+        # Selection: descend through fully expanded nodes by UCB1
+        node = root
+        while not node.untried and node.children:
+            log_n = log(node.visits)
+            best, best_ucb = None, -1.0
+            for child in node.children:
+                ucb = child.score / child.visits + EXPLORATION * sqrt(log_n / child.visits)
+                if ucb > best_ucb:
+                    best, best_ucb = child, ucb
+            node = best
+
+        # Expansion: add one untried move
+        if node.untried:
+            untried = node.untried
+            i = rng.randrange(len(untried))
+            bit = untried[i]
+            untried[i] = untried[-1]
+            untried.pop()
+            mover = "O" if node.mover == "X" else "X"
+            x, o = (node.x | bit, node.o) if mover == "X" else (node.x, node.o | bit)
+            empty = full & ~(x | o)
+            child = Node(x, o, bit, mover, _winner(x, o, bit, mover, empty, lines), node, empty)
+            node.children.append(child)
+            node = child
+
+        # Simulation: random moves on the bare bitmasks until the game ends
+        winner = node.winner
+        if winner is None:
+            x, o = node.x, node.o
+            empty = _bits(full & ~(x | o))
+            rng.shuffle(empty)
+            mover = node.mover
+            for bit in empty:
+                if mover == "X":
+                    mover = "O"
+                    o |= bit
+                    own = o
+                else:
+                    mover = "X"
+                    x |= bit
+                    own = x
+                for mask in lines[bit]:
+                    if own & mask == mask:
+                        winner = mover
+                        break
+                if winner:
+                    break
+            else:
+                winner = "draw"
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner == node.mover:
+                node.score += 1.0
+            elif winner == "draw":
+                node.score += 0.5
+            node = node.parent
+    if progress is not None:
+        progress["nodes"] += count - reported
+    return count
+
+def _worker_playouts(board, k, time_limit, limit, seed):
+    """Grows a private tree from board in a worker process; returns {move bit: (visits, score)}."""
+    lines = cell_lines(board[2], board[3], k)
+    root = _new_root(board, lines)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    playouts(root, lines, (1 << (board[2] * board[3])) - 1, deadline, limit, random.Random(seed))
+    return {child.move: (child.visits, child.score) for child in root.children}
+
+class Tree:
+    """A UCT search tree that is kept between moves of one game.
+
+    k, if given, makes k in a row win instead of a full line. Call close()
+    when done with workers > 1 to shut the process pool down.
+    """
+
+    def __init__(self, k=None, seed=None, workers=1):
+        self.k = k
+        self.rng = random.Random(seed)
+        self.workers = workers
+        self.root = None
+        self.size = None  # (rows, cols) of the root
+        self.pool = None
+        self.reused = 0  # Playouts inherited from earlier searches by the last search
+
+    def advance(self, board):
+        """Makes board the root, keeping its subtree if it is within two plies of the old root."""
+        x, o, rows, cols = board
+        lines = cell_lines(rows, cols, self.k)
+        node = self.root
+        if node is not None and self.size == (rows, cols):
+            for candidate in [node] + node.children + [g for c in node.children for g in c.children]:
+                if candidate.x == x and candidate.o == o:
+                    candidate.parent = None
+                    self.root = candidate
+                    self.reused = candidate.visits
+                    return candidate
+        self.root = _new_root(board, lines)
+        self.size = (rows, cols)
+        self.reused = 0
+        return self.root
+
+    def search(self, board, time_limit=0.5, limit=None, stop=None, progress=None, stats=None):
+        """Searches board for time_limit seconds and/or limit playouts; returns (value, (row, col)).
+
+        value is the root move's average result from X's point of view,
+        between -1 and 1.
+        """
+        x, o, rows, cols = board
+        root = self.advance(board)
+        if root.winner:
+            return {"X": 1, "O": -1, "draw": 0}[root.winner], None
+        lines = cell_lines(rows, cols, self.k)
+        full = (1 << (rows * cols)) - 1
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+
+        futures = []
+        if self.workers > 1:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers - 1)
+            share = None if limit is None else limit // self.workers
+            futures = [self.pool.submit(_worker_playouts, board, self.k, time_limit, share, self.rng.getrandbits(32))
+                       for _ in range(self.workers - 1)]
+            limit = None if limit is None else limit - share * (self.workers - 1)
+        count = playouts(root, lines, full, deadline, limit, self.rng, stop, progress)
+
+        totals = {child.move: [child.visits, child.score] for child in root.children}
+        for future in futures:
+            for bit, (visits, score) in future.result().items():
+                total = totals.setdefault(bit, [0, 0.0])
+                total[0] += visits
+                total[1] += score
+                count += visits
+
+        bit, (visits, score) = max(totals.items(), key=lambda item: item[1][0])
+        mover = "O" if root.mover == "X" else "X"
+        value = 2 * score / visits - 1
+        if mover == "O":
+            value = -value
+        if stats is not None:
+            stats.nodes += count
+            stats.elapsed += time.perf_counter() - started
+            stats.depth = self.depth()
+            log_stats(stats)
+        idx = bit.bit_length() - 1
+        return value, (idx // cols, idx % cols)
+
+    def depth(self):
+        """Returns the length of the most visited line from the root."""
+        node, depth = self.root, 0
+        while node is not None and node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            depth += 1
+        return depth
+
+    def close(self):
+        """Shuts down the worker processes."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+def uct(board, is_maximizing, tree=None, time_limit=0.5, stop=None, progress=None, stats=None):
+    """Runs a UCT search with the arguments of search.iterative_deepening; returns (value, (row, col), depth).
+
+    tree is the game's Tree (the GUI passes it where the other searches take
+    their transposition table), so each move reuses the last one's playouts.
+    is_maximizing is implied by the board and only kept for the signature.
+    """
+    if tree is None:
+        tree = Tree()
+    value, move = tree.search(board, time_limit, stop=stop, progress=progress, stats=stats)
+    depth = tree.depth()
+    if progress is not None:
+        progress["depth"] = depth
+        progress["move"] = move
+    return value, move, depth
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pick a move with Monte Carlo tree search.")
+    parser.add_argument("--size", type=int, default=5, help="board size")
+    parser.add_argument("--k", type=int, help="marks in a row to win (default: a full line)")
+    parser.add_argument("--time", type=float, default=1.0, help="seconds per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to use")
+    args = parser.parse_args(argv)
+
+    tree = Tree(args.k, workers=args.workers)
+    board = bitboard.initial_state(args.size, args.size)
+    try:
+        value, move = tree.search(board, args.time)
+    finally:
+        tree.close()
+    print(f"move {move}, value {value:+.3f}, {tree.root.visits} playouts in the main tree")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Generalized m,n,k engine: any rows x cols board, k marks in a row to win.
+
+Exhaustive search can't finish on large boards, so this engine searches to
+a depth limit and scores the positions there with a static evaluation.
+Every k-square window of the board that holds marks of only one side counts
+for that side, weighted by how many marks it holds. The evaluation and the
+win check are updated incrementally as moves are made and undone.
+"""
+import math
+import time
+
+from .search import SearchTimeout
+from .stats import log_stats
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable, zobrist_keys
+
+WIN = 1_000_000  # Score of a win; a win at ply p scores WIN - p so faster wins rank higher
+
+def windows(rows, cols, k):
+    """Returns every k-square straight window of the board as a list of squares."""
+    out = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < rows and 0 <= end_j < cols:
+                    out.append([(i + di * n) * cols + j + dj * n for n in range(k)])
+    return out
+
+def contributions(k):
+    """Returns table[x][o]: the score of a window holding x X marks and o O marks."""
+    weight = [0] + [10 ** (n - 1) for n in range(1, k + 1)]
+    return [[weight[x] if o == 0 else -weight[o] if x == 0 else 0 for o in range(k + 1)] for x in range(k + 1)]
+
+class MNKState:
+    """An m,n,k board that makes and undoes moves in place.
+
+    Squares are numbered i * cols + j. score is the evaluation from X's point
+    of view and key the Zobrist hash, both kept up to date by make/unmake.
+    """
+
+    def __init__(self, rows, cols, k):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = [None] * (rows * cols)
+        self.windows = windows(rows, cols, k)
+        self.cell_windows = [[] for _ in self.cells]
+        for n, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(n)
+        self.neighbours = [[ni * cols + nj for ni in range(i - 1, i + 2) for nj in range(j - 1, j + 2)
+                            if 0 <= ni < rows and 0 <= nj < cols and (ni, nj) != (i, j)]
+                           for i in range(rows) for j in range(cols)]
+        self.table = contributions(k)
+        self.x_counts = [0] * len(self.windows)
+        self.o_counts = [0] * len(self.windows)
+        x_keys, o_keys = zobrist_keys(rows, cols)
+        self.x_keys = [x_keys[1 << cell] for cell in range(rows * cols)]
+        self.o_keys = [o_keys[1 << cell] for cell in range(rows * cols)]
+        self.score = 0
+        self.key = 0
+        self.turn = "X"
+        self.winner = None
+        self.filled = 0
+        self.stack = []
+
+    @classmethod
+    def from_lists(cls, state, k):
+        """Builds the state from a list-of-lists board."""
+        rows, cols = len(state), len(state[0])
+        s = cls(rows, cols, k)
+        for i in range(rows):
+            for j in range(cols):
+                if state[i][j] is not None:
+                    s.turn = state[i][j]
+                    s.make(i * cols + j)
+        s.turn = "X" if s.cells.count("X") == s.cells.count("O") else "O"
+        s.stack.clear()  # The starting marks can't be taken back
+        return s
+
+    def make(self, cell):
+        """Plays cell for the side to move."""
+        if self.cells[cell] is not None:
+            raise ValueError("Invalid action")
+        mark = self.turn
+        table = self.table
+        x_counts, o_counts = self.x_counts, self.o_counts
+        score = self.score
+        if mark == "X":
+            for w in self.cell_windows[cell]:
+                x, o = x_counts[w], o_counts[w]
+                score += table[x + 1][o] - table[x][o]
+                x_counts[w] = x + 1
+                if x + 1 == self.k:
+                    self.winner = "X"
+            self.key ^= self.x_keys[cell]
+            self.turn = "O"
+        else:
+            for w in self.cell_windows[cell]:
+                x, o = x_counts[w], o_counts[w]
+                score += table[x][o + 1] - table[x][o]
+                o_counts[w] = o + 1
+                if o + 1 == self.k:
+                    self.winner = "O"
+            self.key ^= self.o_keys[cell]
+            self.turn = "X"
+        self.score = score
+        self.cells[cell] = mark
+        self.filled += 1
+        self.stack.append(cell)
+
+    def unmake(self):
+        """Takes back the last move."""
+        cell = self.stack.pop()
+        mark = self.cells[cell]
+        table = self.table
+        x_counts, o_counts = self.x_counts, self.o_counts
+        score = self.score
+        if mark == "X":
+            for w in self.cell_windows[cell]:
+                x, o = x_counts[w], o_counts[w]
+                score += table[x - 1][o] - table[x][o]
+                x_counts[w] = x - 1
+            self.key ^= self.x_keys[cell]
+        else:
+            for w in self.cell_windows[cell]:
+                x, o = x_counts[w], o_counts[w]
+                score += table[x][o - 1] - table[x][o]
+                o_counts[w] = o - 1
+            self.key ^= self.o_keys[cell]
+        self.score = score
+        self.cells[cell] = None
+        self.filled -= 1
+        self.winner = None  # Play stops at a win, so only the last move could have made one
+        self.turn = mark
+
+    def terminal(self):
+        """Checks if the game has ended (either a win or a draw)."""
+        return self.winner is not None or self.filled == len(self.cells)
+
+    def candidates(self):
+        """Returns the empty squares next to a mark (the centre on an empty board)."""
+        if not self.filled:
+            return [(self.rows // 2) * self.cols + self.cols // 2]
+        cells = self.cells
+        seen = set()
+        for cell, mark in enumerate(cells):
+            if mark is not None:
+                for n in self.neighbours[cell]:
+                    if cells[n] is None:
+                        seen.add(n)
+        return sorted(seen)
+
+def check_winner(state, k):
+    """Returns the winner of a list-of-lists board where k in a row wins, if any."""
+    line = winning_line(state, k)
+    return state[line[0][0]][line[0][1]] if line else None
+
+def terminal(state, k):
+    """Checks if a list-of-lists k-in-a-row game has ended."""
+    return check_winner(state, k) is not None or not any(None in row for row in state)
+
+def winning_line(state, k):
+    """Returns the squares [(row, col), ...] of a completed window, or None."""
+    rows, cols = len(state), len(state[0])
+    for window in windows(rows, cols, k):
+        marks = {state[cell // cols][cell % cols] for cell in window}
+        if len(marks) == 1 and None not in marks:
+            return [(cell // cols, cell % cols) for cell in window]
+    return None
+
+def minimax(s, is_maximizing, depth, table=None, history=None, deadline=None, stop=None,
+            progress=None, stats=None):
+    """Depth-limited alpha-beta on an MNKState; returns (value, (row, col)).
+
+    Wins score WIN - ply for X and -(WIN - ply) for O; other positions at the
+    depth limit take the static evaluation. Only squares next to a mark are
+    searched, table move first, then by history score.
+    """
+    if table is None:
+        table = TranspositionTable()
+    if history is None:
+        history = [0] * len(s.cells)
+    nodes = 0
+    counting = stats is not None
+    if counting:
+        ply_nodes = stats.ply_nodes
+        ply_nodes.extend([0] * (len(s.cells) + 1 - len(ply_nodes)))
+
+    def search(depth, ply, is_maximizing, alpha, beta):
+        nonlocal nodes
+        nodes += 1
+        if counting:
+            ply_nodes[ply] += 1
+        if nodes & 1023 == 0:
+            if progress is not None:
+                progress["nodes"] += 1024
+            if deadline is not None and time.perf_counter() > deadline:
+                raise SearchTimeout
+            if stop is not None and stop.is_set():
+                raise SearchTimeout
+        if s.winner is not None:
+            return (WIN - ply if s.winner == "X" else ply - WIN), None
+        if s.filled == len(s.cells):
+            return 0, None
+        if depth <= 0:
+            return s.score, None
+
+        key = s.key
+        first = None
+        entry = table.probe(key)
+        if counting:
+            stats.table_probes += 1
+            stats.table_hits += entry is not None
+        if entry is not None:
+            _, entry_depth, value, flag, first = entry
+            if entry_depth >= depth and abs(value) < WIN - len(s.cells):  # Win scores depend on ply
+                if flag == EXACT:
+                    if counting:
+                        stats.table_cutoffs += 1
+                    return value, first
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if beta <= alpha:
+                    if counting:
+                        stats.table_cutoffs += 1
+                    return value, first
+
+        order = s.candidates()
+        order.sort(key=history.__getitem__, reverse=True)
+        if first in order:
+            order.remove(first)
+            order.insert(0, first)
+
+        alpha_orig, beta_orig = alpha, beta
+        best_cell = None
+        if is_maximizing:
+            best_value = -math.inf
+            for cell in order:
+                s.make(cell)
+                value, _ = search(depth - 1, ply + 1, False, alpha, beta)
+                s.unmake()
+                if value > best_value:
+                    best_value = value
+                    best_cell = cell
+                alpha = max(alpha, best_value)
+                if beta <= alpha:  # Beta cut-off
+                    if counting:
+                        stats.beta_cutoffs += 1
+                    break
+        else:
+            best_value = math.inf
+            for cell in order:
+                s.make(cell)
+                value, _ = search(depth - 1, ply + 1, True, alpha, beta)
+                s.unmake()
+                if value < best_value:
+                    best_value = value
+                    best_cell = cell
+                beta = min(beta, best_value)
+                if beta <= alpha:  # Alpha cut-off
+                    if counting:
+                        stats.alpha_cutoffs += 1
+                    break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta_orig:
+            flag = LOWER
+            history[best_cell] += depth * depth
+        else:
+            flag = EXACT
+        table.store(key, depth, best_value, flag, best_cell)
+        return best_value, best_cell
+
+    started = time.perf_counter()
+    try:
+        value, cell = search(depth, 0, is_maximizing, -math.inf, math.inf)
+    finally:
+        if progress is not None:
+            progress["nodes"] += nodes & 1023
+        if counting:
+            stats.nodes += nodes
+            stats.elapsed += time.perf_counter() - started
+    if counting:
+        log_stats(stats)
+    return value, (divmod(cell, s.cols) if cell is not None else None)
+
+def iterative_deepening(s, is_maximizing, table=None, time_limit=0.5, stop=None, progress=None, stats=None):
+    """Searches an MNKState 1, 2, 3... plies deep until time_limit seconds pass or stop is set.
+
+    Same arguments and result as search.iterative_deepening, so the GUI
+    worker can run either: (value, (row, col), depth) from the deepest
+    search that finished.
+    """
+    if s.terminal():
+        return 0, None, 0
+    if table is None:
+        table = TranspositionTable()
+    history = [0] * len(s.cells)
+    deadline = time.perf_counter() + time_limit
+    first = divmod(s.candidates()[0], s.cols)
+    best = (0, first, 0)
+    base = len(s.stack)
+    for depth in range(1, len(s.cells) - s.filled + 1):
+        try:
+            value, move = minimax(s, is_maximizing, depth, table, history, deadline, stop, progress, stats)
+        except SearchTimeout:
+            while len(s.stack) > base:  # Take back the moves the interrupted search had made
+                s.unmake()
+            break
+        best = (value, move, depth)
+        if stats is not None:
+            stats.depth = depth
+        if progress is not None:
+            progress["depth"] = depth
+            progress["move"] = move
+        if abs(value) >= WIN - len(s.cells):  # A forced win or loss was found
+            break
+    return best
@@ -0,0 +1,79 @@
+"""Negamax search with principal variation search and aspiration windows.
+
+A drop-in alternative to engine.search: same arguments, same results, same
+transposition table format. Both run the one search in engine.search,
+which scores every position for the side to move (negamax). Here, after
+the first (principal) move of a node, the other moves are only tested
+with a null window (alpha, alpha + 1) to prove they are no better; a move
+that fails high is searched again with the full window. Iterative
+deepening starts each iteration with a narrow window around the previous
+value and widens it only when the value falls outside.
+"""
+import math
+import time
+
+from . import bitboard
+from . import search
+from .search import WIN, SearchTimeout
+from .transposition import TranspositionTable
+
+ASPIRATION = 1  # Half-width of the aspiration window around the previous iteration's value
+
+def minimax(board, is_maximizing, table=None, alpha=-math.inf, beta=math.inf,
+            depth=math.inf, killers=None, history=None, deadline=None, stop=None, progress=None,
+            stats=None):
+    """Principal variation search; returns (value, (row, col)) like search.minimax.
+
+    This is search.minimax with its null-window tests turned on: alpha,
+    beta and the returned value are from X's point of view, the table holds
+    X's values, and killers and history are kept the same way, so tables
+    and move-ordering scores can be shared between the two.
+    """
+    return search.minimax(board, is_maximizing, table, alpha, beta, depth, killers, history, deadline, stop,
+                          progress, stats, pvs=True)
+
+def iterative_deepening(board, is_maximizing, table=None, time_limit=0.5, stop=None, progress=None,
+                        stats=None):
+    """Searches 1, 2, 3... plies deep with aspiration windows, like search.iterative_deepening.
+
+    Each iteration after the first searches the window previous value +/-
+    ASPIRATION, and repeats with that side opened up if the value lands on
+    or outside it.
+    """
+    x, o, rows, cols = board
+    if bitboard.terminal(board):
+        return bitboard.utility(board) * WIN, None, 0
+    if table is None:
+        table = TranspositionTable()
+    killers = [[0, 0] for _ in range(rows * cols + 1)]
+    history = dict.fromkeys(bitboard.tables(rows, cols)[1], 0)
+    deadline = time.perf_counter() + time_limit
+    remaining = rows * cols - (x | o).bit_count()
+    best = (0, bitboard.actions(board)[0], 0)
+
+    for depth in range(1, remaining + 1):
+        if depth == 1:
+            alpha, beta = -math.inf, math.inf
+        else:
+            alpha, beta = best[0] - ASPIRATION, best[0] + ASPIRATION
+        try:
+            while True:
+                value, move = minimax(board, is_maximizing, table, alpha, beta, depth, killers, history,
+                                      deadline, stop, progress, stats)
+                if value <= alpha:
+                    alpha = -math.inf
+                elif value >= beta:
+                    beta = math.inf
+                else:
+                    break
+        except SearchTimeout:
+            break
+        best = (value, move, depth)
+        if stats is not None:
+            stats.depth = depth
+        if progress is not None:
+            progress["depth"] = depth
+            progress["move"] = move
+        if abs(value) >= WIN - depth:  # A win or loss within the depth searched is exact
+            break
+    return best
@@ -0,0 +1,146 @@
+"""Opening books for the boards too big to solve, built offline and read with mmap.
+
+Every symmetry-distinct position up to a number of plies is searched once,
+deeply and in parallel, and its best move, value and search depth are kept
+as a fixed-size record. The records are sorted by the canonical position
+key (x | o << squares), so a lookup is a binary search over the file with
+no index to load first; a position is reduced to its canonical image, and
+the stored move mapped back from it.
+
+Build a book with:  python -m engine.openings --size 5 --plies 3 --time 2
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard, negamax, symmetry
+from .transposition import TranspositionTable
+
+MAGIC = b"TTOB"
+HEADER = struct.Struct("<4sBBB")  # Magic, rows, cols, plies
+RECORD = struct.Struct("<QhBB")  # Canonical key, value for X, move square in the canonical image, depth
+
+_LOADED = {}
+
+def path_for(rows, cols):
+    """Returns the file the opening book for this size is stored in."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"book_{rows}x{cols}.bin")
+
+def positions(rows, cols, plies):
+    """Returns the canonical non-terminal positions with at most plies marks, fewest marks first."""
+    layer = [symmetry.canonical(bitboard.initial_state(rows, cols))[0]]
+    found = list(layer)
+    for _ in range(plies):
+        following = set()
+        for board in layer:
+            for move in bitboard.actions(board):
+                child = bitboard.result(board, move)
+                if not bitboard.terminal(child):
+                    following.add(symmetry.canonical(child)[0])
+        layer = sorted(following)
+        found += layer
+    return found
+
+# Set in each worker process by _init_worker
+_TABLE = None
+
+def _init_worker():
+    global _TABLE
+    _TABLE = TranspositionTable()
+
+def _search(board, time_limit):
+    """Searches one position in a worker process; returns its record fields but the key."""
+    cols = board[3]
+    value, (i, j), depth = negamax.iterative_deepening(board, bitboard.player(board) == "X", _TABLE, time_limit)
+    return value, i * cols + j, depth
+
+def build(rows, cols, plies=3, time_limit=2.0, workers=None, path=None):
+    """Searches every position up to plies marks for time_limit seconds each and writes the book."""
+    if rows * cols > 32:
+        raise ValueError("positions of more than 32 squares don't fit a record's key")
+    boards = positions(rows, cols, plies)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as pool:
+        for board, fields in zip(boards, pool.map(_search, boards, [time_limit] * len(boards))):
+            x, o, _, _ = board
+            records.append((x | o << (rows * cols),) + fields)
+    records.sort()
+    with open(path or path_for(rows, cols), "wb") as f:
+        f.write(HEADER.pack(MAGIC, rows, cols, plies))
+        for record in records:
+            f.write(RECORD.pack(*record))
+    return len(records)
+
+class OpeningBook:
+    """A memory-mapped opening book file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.cols, self.plies = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"Not an opening book file: {path}")
+        self.count = (len(self.data) - HEADER.size) // RECORD.size
+
+    def _record(self, key):
+        """Binary-searches the records for key; returns (value, square, depth) or None."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = RECORD.unpack_from(self.data, HEADER.size + mid * RECORD.size)
+            if record[0] < key:
+                lo = mid + 1
+            elif record[0] > key:
+                hi = mid
+            else:
+                return record[1:]
+        return None
+
+    def probe(self, board, stats=None):
+        """Returns (value, (row, col), depth) for board, or None if it isn't in the book.
+
+        A hit is counted in stats, a SearchStats, if given, which also takes
+        the depth the book's search reached.
+        """
+        x, o, rows, cols = board
+        if (rows, cols) != (self.rows, self.cols) or (x | o).bit_count() > self.plies:
+            return None
+        (cx, co, _, _), idx = symmetry.canonical(board)
+        record = self._record(cx | co << (rows * cols))
+        if record is None:
+            return None
+        value, square, depth = record
+        bit = symmetry.inverse_maps(rows, cols)[idx][1 << square]  # Back from the canonical image
+        if stats is not None:
+            stats.book_hits += 1
+            stats.depth = depth
+        square = bit.bit_length() - 1
+        return value, (square // cols, square % cols), depth
+
+def load(rows, cols):
+    """Returns the opening book for this size, or None if it hasn't been built; opened on first use."""
+    size = (rows, cols)
+    if size not in _LOADED:
+        path = path_for(rows, cols)
+        _LOADED[size] = OpeningBook(path) if os.path.exists(path) else None
+    return _LOADED[size]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book by searching every early position.")
+    parser.add_argument("--size", type=int, default=5, help="board size")
+    parser.add_argument("--plies", type=int, default=3, help="most marks on a book position")
+    parser.add_argument("--time", type=float, default=2.0, help="seconds to search each position")
+    parser.add_argument("--workers", type=int, help="search processes (default: all cores)")
+    parser.add_argument("--output", help="file to write (default: engine/book_<size>x<size>.bin)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = build(args.size, args.size, args.plies, args.time, args.workers, args.output)
+    print(f"{args.size}x{args.size}: {count} positions to {args.output or path_for(args.size, args.size)} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Parallel root search: the moves at the root are split across a process pool.
+
+The first move is searched on its own to get a bound (Young Brothers Wait).
+The other moves then run in parallel. All workers share the best score found
+so far, so each new subtree starts with a window at least that tight, and
+running subtrees stop once a win at the first move has been proven, as
+no move can do better.
+"""
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+from . import search
+from . import symmetry
+from .transposition import TranspositionTable
+
+# Set in each worker process by _init_worker
+_BEST = None
+_TABLE = None
+
+class _Proven:
+    """Stop flag for search.minimax: set once some root move is proven to win at once."""
+
+    def is_set(self):
+        return _BEST.value >= search.WIN - 1
+
+def _init_worker(best):
+    global _BEST, _TABLE
+    _BEST = best
+    _TABLE = TranspositionTable()
+
+def _search_move(board, is_maximizing, move):
+    """Searches one root move; returns (score for the root player, exact?) or None if skipped."""
+    bound = _BEST.value
+    if bound >= search.WIN - 1:
+        return None
+    child = bitboard.result(board, move)
+    if bitboard.terminal(child):
+        value = bitboard.utility(child) * (search.WIN - 1)
+    else:
+        # Only a score above the shared bound matters, so search with that window
+        alpha, beta = (bound, math.inf) if is_maximizing else (-math.inf, -bound)
+        try:
+            value, _ = search.minimax(child, not is_maximizing, _TABLE, search.to_node(alpha, 1),
+                                      search.to_node(beta, 1), stop=_Proven())
+        except search.SearchTimeout:
+            return None
+        value = search.to_root(value, 1)  # The child's win scores count from the child
+    score = value if is_maximizing else -value
+    with _BEST.get_lock():
+        if score > _BEST.value:
+            _BEST.value = score
+    return score, score > bound
+
+def parallel_minimax(board, is_maximizing, workers=None):
+    """Searches the root moves of board on a pool of processes; returns (value, (row, col)).
+
+    workers defaults to the number of CPUs. Returns the same value as
+    search.minimax and a move that achieves it.
+    """
+    if bitboard.terminal(board):
+        return bitboard.utility(board), None
+    moves = symmetry.unique_moves(board)
+    best = multiprocessing.Value("d", -math.inf)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(best,)) as pool:
+        eldest = pool.submit(_search_move, board, is_maximizing, moves[0]).result()
+        futures = [pool.submit(_search_move, board, is_maximizing, move) for move in moves[1:]]
+        results = [eldest] + [future.result() for future in futures]
+
+    # Only exact scores can be compared; a fail-low score is just an upper bound
+    best_score, best_move = -math.inf, None
+    for move, outcome in zip(moves, results):
+        if outcome is not None and outcome[1] and outcome[0] > best_score:
+            best_score, best_move = outcome[0], move
+    return (best_score if is_maximizing else -best_score), best_move
+
+# Positions used by benchmark(): (size, moves played from the empty board)
+BENCH_POSITIONS = [
+    (4, []),
+    (4, [(1, 1)]),
+    (4, [(0, 0), (1, 1)]),
+    (5, [(0, 0), (1, 1), (2, 2), (3, 3), (0, 4), (4, 0), (2, 0), (0, 2), (1, 3), (3, 1)]),
+]
+
+def benchmark(max_workers=None, positions=BENCH_POSITIONS):
+    """Times serial search.minimax against parallel_minimax with 1..max_workers processes."""
+    max_workers = max_workers or os.cpu_count()
+    for size, moves in positions:
+        board = bitboard.initial_state(size, size)
+        for move in moves:
+            board = bitboard.result(board, move)
+        is_maximizing = bitboard.player(board) == "X"
+
+        start = time.perf_counter()
+        value, move = search.minimax(board, is_maximizing)
+        serial = time.perf_counter() - start
+        print(f"{size}x{size} after {len(moves)} moves: value {value}, move {move}, serial {serial:.2f}s")
+
+        for workers in range(1, max_workers + 1):
+            start = time.perf_counter()
+            p_value, p_move = parallel_minimax(board, is_maximizing, workers)
+            elapsed = time.perf_counter() - start
+            check = "" if p_value == value else "  VALUE MISMATCH"
+            print(f"  {workers} workers: {elapsed:.2f}s, speedup {serial / elapsed:.2f}x, move {p_move}{check}")
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,309 @@
+"""Alpha-beta search on bitboards with a Zobrist transposition table."""
+import math
+import time
+from operator import xor
+
+from . import bitboard
+from . import symmetry
+from . import threats
+from .stats import log_stats
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+WIN = 1000  # Score of a win p plies from the searched position: WIN - p, so faster wins score higher
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the deadline passes or it is cancelled."""
+
+def to_node(value, ply):
+    """Converts a score counted from the search's root into one counted from a position ply plies down.
+
+    The table keeps win scores counted from the stored position, so they
+    stay right when it is reached at another ply or from another root.
+    """
+    if value > WIN // 2:
+        return value + ply
+    if value < -WIN // 2:
+        return value - ply
+    return value
+
+def to_root(value, ply):
+    """Converts a score counted from a position ply plies down back into one counted from the root."""
+    return to_node(value, -ply)
+
+def minimax(board, is_maximizing, table=None, alpha=-math.inf, beta=math.inf,
+            depth=math.inf, killers=None, history=None, deadline=None, stop=None, progress=None,
+            stats=None, pvs=False):
+    """Alpha-beta minimax that reuses results from table; returns (value, (row, col)).
+
+    Pass the same table on every call of a game so later moves reuse earlier work.
+    Positions are stored under their canonical key, so all 8 symmetric images
+    share one entry, and moves that are mirror images of one already searched
+    are skipped while the position is symmetric.
+
+    X winning scores WIN minus the plies to the win, O winning the negation,
+    so the fastest win and the slowest loss are preferred; positions at the
+    depth limit score 0. A win can't come sooner than the next move, so
+    the window is narrowed to what is still possible at each ply (mate
+    distance pruning); at the root this ends the search as soon as a move
+    reaches the best score left.
+    Every position is first checked for threats (engine.threats): a side
+    that can win at once does, a side facing two threats loses, and a side
+    facing one only searches the block. Forced blocks don't use up depth,
+    so forced sequences are followed past the limit. Once no line can be
+    completed by either side the position is a draw, and a side with too
+    few moves left to complete any line can't win, which bounds the value
+    by 0.
+    Moves are tried in the order: table move, killers for the ply, then by
+    history score. With pvs, every move after a node's first is only tested
+    with a null window, as engine.negamax explains. Raises SearchTimeout once
+    time.perf_counter() passes deadline or the threading.Event stop is set.
+    If progress is a dict, its "nodes" count is kept up to date while the
+    search runs and is exact once it returns.
+    If stats is a SearchStats, the search adds its counters to it and logs it.
+    """
+    x, o, rows, cols = board
+    if bitboard.terminal(board):
+        return bitboard.utility(board) * WIN, None
+    if table is None:
+        table = TranspositionTable()
+    if killers is None:
+        killers = [[0, 0] for _ in range(rows * cols + 1)]
+    if history is None:
+        history = dict.fromkeys(bitboard.tables(rows, cols)[1], 0)
+    masks, lines = bitboard.tables(rows, cols)
+    maps = symmetry.bit_maps(rows, cols)
+    inverses = symmetry.inverse_maps(rows, cols)
+    x_sym, o_sym = symmetry.symmetric_keys(rows, cols)
+    line_bits = threats.line_bits(masks)
+    nodes = 0
+    counting = stats is not None
+    if counting:
+        ply_nodes = stats.ply_nodes
+        ply_nodes.extend([0] * (rows * cols + 1 - len(ply_nodes)))
+        root_times = stats.root_times
+
+    def search(own, other, empty, keys, live, depth, ply, color, alpha, beta):
+        """Searches with own to move; color is 1 when own is X and -1 when it is O.
+
+        alpha, beta and the value returned are own's: X's scores times color.
+        """
+        nonlocal nodes
+        nodes += 1
+        if counting:
+            ply_nodes[ply] += 1
+        if nodes & 1023 == 0:
+            if progress is not None:
+                progress["nodes"] += 1024
+            if deadline is not None and time.perf_counter() > deadline:
+                raise SearchTimeout
+            if stop is not None and stop.is_set():
+                raise SearchTimeout
+        if not empty:
+            return 0, None
+        if not live:  # Every line is dead: a draw
+            if counting:
+                stats.draw_cutoffs += 1
+            return 0, empty & -empty
+        wins = threats.completing(own, other, masks)
+        if wins:  # Win at once
+            return WIN - ply - 1, wins & -wins
+        forced = threats.completing(other, own, masks)
+        if forced & (forced - 1):  # Two threats: only one can be blocked
+            return ply + 2 - WIN, forced & -forced
+        if depth <= 0 and not forced:
+            return 0, None
+
+        # Mate distance: with no win at once, the mover wins at ply + 3 at best and loses at ply + 4 at worst
+        alpha = max(alpha, ply + 4 - WIN)
+        beta = min(beta, WIN - ply - 3)
+        if beta <= alpha:
+            return alpha, empty & -empty
+
+        # A side that needs more squares on every open line than it has moves left can't win
+        count = empty.bit_count()
+        own_need, other_need = threats.needs(own, other, masks, live)
+        if own_need > (count + 1) // 2:
+            beta = min(beta, 0)
+        if other_need > count // 2:
+            alpha = max(alpha, 0)
+        if beta <= alpha:
+            if counting:
+                stats.draw_cutoffs += 1
+            return 0, empty & -empty
+
+        draft = min(depth, count)
+        key = min(keys)
+        frame = keys.index(key)  # Moves are stored in the canonical image's frame
+        first = 0
+        entry = table.probe(key)
+        if counting:
+            stats.table_probes += 1
+            stats.table_hits += entry is not None
+        if entry is not None:
+            _, entry_draft, value, flag, first = entry
+            if first is not None:
+                first = inverses[frame][first]
+            if entry_draft >= draft:
+                value = to_root(value, ply) * color  # Stored for X; O's lower bounds are X's upper bounds
+                if flag == EXACT:
+                    if counting:
+                        stats.table_cutoffs += 1
+                    return value, first
+                if flag == (LOWER if color == 1 else UPPER):
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if beta <= alpha:
+                    if counting:
+                        stats.table_cutoffs += 1
+                    return value, first
+
+        # Symmetries that map this position onto itself make some moves equivalent
+        same = [maps[t] for t in range(1, len(keys)) if keys[t] == keys[0]]
+        if same:
+            same = [m for m in same if symmetry.transform(own, m) == own and symmetry.transform(other, m) == other]
+        skip = 0
+
+        # Table (principal variation) move first, then killers, then by history
+        if forced:  # Blocking is the only move that doesn't lose at once; it uses no depth
+            order = [forced]
+            child_depth = depth
+        else:
+            order = []
+            if first and first & empty:
+                order.append(first)
+            for killer in killers[ply]:
+                if killer & empty and killer not in order:
+                    order.append(killer)
+            rest = []
+            moves = empty
+            while moves:
+                bit = moves & -moves
+                moves ^= bit
+                if bit not in order:
+                    rest.append(bit)
+            rest.sort(key=history.__getitem__, reverse=True)
+            order += rest
+            child_depth = depth - 1
+
+        own_sym = x_sym if color == 1 else o_sym
+        alpha_orig = alpha
+        best_value = -math.inf
+        best_bit = None
+        for bit in order:
+            if bit & skip:
+                continue
+            for m in same:
+                skip |= m[bit]
+            mine = own | bit
+            child_live = live
+            for mask in lines[bit]:  # No move wins here: that was caught above
+                if other & mask:
+                    child_live &= ~line_bits[mask]
+            if counting and ply == 0:
+                started = time.perf_counter()
+            child_keys = tuple(map(xor, keys, own_sym[bit]))
+            if pvs and best_bit is not None:
+                # Null window: only prove the move is no better than the best so far
+                value = -search(other, mine, empty ^ bit, child_keys, child_live, child_depth, ply + 1, -color,
+                                -alpha - 1, -alpha)[0]
+                if alpha < value < beta:  # Failed high: search again for the exact value
+                    value = -search(other, mine, empty ^ bit, child_keys, child_live, child_depth, ply + 1,
+                                    -color, -beta, -value)[0]
+            else:
+                value = -search(other, mine, empty ^ bit, child_keys, child_live, child_depth, ply + 1, -color,
+                                -beta, -alpha)[0]
+            if counting and ply == 0:
+                move = divmod(bit.bit_length() - 1, cols)
+                root_times[move] = root_times.get(move, 0.0) + time.perf_counter() - started
+            if value > best_value:
+                best_value = value
+                best_bit = bit
+            alpha = max(alpha, best_value)
+            if beta <= alpha:
+                if counting:
+                    if color == 1:
+                        stats.beta_cutoffs += 1
+                    else:
+                        stats.alpha_cutoffs += 1
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+            # A cut-off for the side to move, X or O: remember the refutation.
+            # No killer from a proven draw: once the cap or the mate-distance window
+            # closes on 0, the first move that holds the draw cuts off, and in a drawn
+            # game those killers push the real refutations back. A 0 short of the
+            # end is only the horizon, so depth-limited searches still keep theirs.
+            if (best_value or draft < count) and killers[ply][0] != best_bit:
+                killers[ply] = [best_bit, killers[ply][0]]
+            history[best_bit] += draft * draft
+        else:
+            flag = EXACT
+        if color == -1 and flag != EXACT:  # The table keeps X's bounds
+            flag = LOWER if flag == UPPER else UPPER
+        if draft > 0:  # Forced lines past the limit aren't worth a slot
+            table.store(key, draft, to_node(best_value * color, ply), flag, maps[frame][best_bit])
+        return best_value, best_bit
+
+    empty = ((1 << (rows * cols)) - 1) & ~(x | o)
+    keys = symmetry.position_keys(board)
+    live = threats.open_lines(x, o, masks)
+    started = time.perf_counter()
+    try:
+        if is_maximizing:
+            value, bit = search(x, o, empty, keys, live, depth, 0, 1, alpha, beta)
+        else:
+            value, bit = search(o, x, empty, keys, live, depth, 0, -1, -beta, -alpha)
+            value = -value
+    finally:
+        if progress is not None:
+            progress["nodes"] += nodes & 1023  # The rest since the last 1024-node update
+        if counting:
+            stats.nodes += nodes
+            stats.elapsed += time.perf_counter() - started
+    if counting:
+        log_stats(stats)
+    if bit is None:  # At depth 0 with nothing forced no move is searched
+        return value, None
+    idx = bit.bit_length() - 1
+    return value, (idx // cols, idx % cols)
+
+def iterative_deepening(board, is_maximizing, table=None, time_limit=0.5, stop=None, progress=None,
+                        stats=None):
+    """Searches 1, 2, 3... plies deep until time_limit seconds pass or stop is set.
+
+    Returns (value, (row, col), depth) from the deepest search that finished.
+    Each iteration tries the previous iteration's best moves first (they are
+    in the table), and killer and history scores carry over between iterations.
+    progress, if given, is a dict whose "nodes", "depth" and "move" entries
+    are updated as the search goes. stats, if given, sums every iteration.
+    """
+    x, o, rows, cols = board
+    if bitboard.terminal(board):
+        return bitboard.utility(board) * WIN, None, 0
+    if table is None:
+        table = TranspositionTable()
+    killers = [[0, 0] for _ in range(rows * cols + 1)]
+    history = dict.fromkeys(bitboard.tables(rows, cols)[1], 0)
+    deadline = time.perf_counter() + time_limit
+    remaining = rows * cols - (x | o).bit_count()
+    best = (0, bitboard.actions(board)[0], 0)
+
+    for depth in range(1, remaining + 1):
+        try:
+            value, move = minimax(board, is_maximizing, table, depth=depth, killers=killers, history=history,
+                                  deadline=deadline, stop=stop, progress=progress, stats=stats)
+        except SearchTimeout:
+            break
+        best = (value, move, depth)
+        if stats is not None:
+            stats.depth = depth
+        if progress is not None:
+            progress["depth"] = depth
+            progress["move"] = move
+        if abs(value) >= WIN - depth:  # A win or loss within the depth searched is exact
+            break
+    return best
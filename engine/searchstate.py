@@ -0,0 +1,170 @@
+"""Mutable search state: moves are made and undone in place on a move stack."""
+import math
+
+from . import bitboard
+
+class SearchState:
+    """A board that applies and undoes moves in place.
+
+    Squares are numbered i * cols + j. For every winning line the state keeps
+    how many X and O marks it holds, so making a move only touches the lines
+    through that square: a win is spotted when a count reaches the line's
+    length and a draw when the board is full. The side to move is tracked
+    too, so nothing has to be recounted or copied per node.
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.cells = [None] * (rows * cols)
+        self.lines = [[idx for idx in range(rows * cols) if mask >> idx & 1]
+                      for mask in bitboard.tables(rows, cols)[0]]
+        self.line_length = [len(line) for line in self.lines]
+        self.cell_lines = [[n for n, line in enumerate(self.lines) if idx in line]
+                           for idx in range(rows * cols)]
+        self.counts = {"X": [0] * len(self.lines), "O": [0] * len(self.lines)}
+        self.turn = "X"
+        self.winner = None
+        self.filled = 0
+        self.stack = []
+
+    @classmethod
+    def from_lists(cls, state):
+        """Builds a search state from a list-of-lists board."""
+        rows, cols = len(state), len(state[0])
+        s = cls(rows, cols)
+        for i in range(rows):
+            for j in range(cols):
+                if state[i][j] is not None:
+                    s.place(i * cols + j, state[i][j])
+        s.turn = "X" if s.cells.count("X") == s.cells.count("O") else "O"
+        s.stack.clear()  # The starting marks can't be taken back
+        return s
+
+    def to_lists(self):
+        """Returns the board as a list of lists."""
+        return [self.cells[i * self.cols:(i + 1) * self.cols] for i in range(self.rows)]
+
+    def place(self, cell, mark):
+        """Puts mark on cell and updates the line counts."""
+        self.cells[cell] = mark
+        counts = self.counts[mark]
+        for line in self.cell_lines[cell]:
+            counts[line] += 1
+            if counts[line] == self.line_length[line]:
+                self.winner = mark
+        self.filled += 1
+        self.stack.append(cell)
+
+    def make(self, cell):
+        """Plays cell for the side to move."""
+        if self.cells[cell] is not None:
+            raise ValueError("Invalid action")
+        self.place(cell, self.turn)
+        self.turn = "O" if self.turn == "X" else "X"
+
+    def unmake(self):
+        """Takes back the last move."""
+        cell = self.stack.pop()
+        mark = self.cells[cell]
+        self.cells[cell] = None
+        counts = self.counts[mark]
+        for line in self.cell_lines[cell]:
+            counts[line] -= 1
+        self.filled -= 1
+        self.winner = None  # Play stops at a win, so only the last move could have made one
+        self.turn = mark
+
+    def actions(self):
+        """Returns the empty squares."""
+        return [cell for cell, mark in enumerate(self.cells) if mark is None]
+
+    def terminal(self):
+        """Checks if the game has ended (either a win or a draw)."""
+        return self.winner is not None or self.filled == len(self.cells)
+
+    def utility(self):
+        """Returns the score of the state (1 if X wins, -1 if O wins, 0 if draw)."""
+        if self.winner == "X":
+            return 1
+        elif self.winner == "O":
+            return -1
+        else:
+            return 0
+
+    def move(self, cell):
+        """Converts a square number to (row, col)."""
+        return (cell // self.cols, cell % self.cols) if cell is not None else None
+
+class CountingState(SearchState):
+    """SearchState that counts the moves made, i.e. the nodes searched."""
+
+    nodes = 0
+
+    def make(self, cell):
+        self.nodes += 1
+        super().make(cell)
+
+def minimax(s, is_maximizing):
+    """Exhaustive minimax on a SearchState; returns (value, (row, col))."""
+    value, cell = _minimax(s, is_maximizing)
+    return value, s.move(cell)
+
+def _minimax(s, is_maximizing):
+    if s.winner is not None or s.filled == len(s.cells):
+        return s.utility(), None
+
+    cells = s.cells
+    best_value = -math.inf if is_maximizing else math.inf
+    best_cell = None
+    for cell in range(len(cells)):
+        if cells[cell] is not None:
+            continue
+        s.make(cell)
+        value, _ = _minimax(s, not is_maximizing)
+        s.unmake()
+        if value > best_value if is_maximizing else value < best_value:
+            best_value = value
+            best_cell = cell
+    return best_value, best_cell
+
+def alphabeta(s, is_maximizing, alpha=-math.inf, beta=math.inf):
+    """Alpha-beta minimax on a SearchState; returns (value, (row, col))."""
+    value, cell = _alphabeta(s, is_maximizing, alpha, beta)
+    return value, s.move(cell)
+
+def _alphabeta(s, is_maximizing, alpha, beta):
+    if s.winner is not None or s.filled == len(s.cells):
+        return s.utility(), None
+
+    cells = s.cells
+    best_cell = None
+    if is_maximizing:
+        best_value = -math.inf
+        for cell in range(len(cells)):
+            if cells[cell] is not None:
+                continue
+            s.make(cell)
+            value, _ = _alphabeta(s, False, alpha, beta)
+            s.unmake()
+            if value > best_value:
+                best_value = value
+                best_cell = cell
+            alpha = max(alpha, best_value)
+            if beta <= alpha:  # Beta cut-off
+                break
+    else:
+        best_value = math.inf
+        for cell in range(len(cells)):
+            if cells[cell] is not None:
+                continue
+            s.make(cell)
+            value, _ = _alphabeta(s, True, alpha, beta)
+            s.unmake()
+            if value < best_value:
+                best_value = value
+                best_cell = cell
+            beta = min(beta, best_value)
+            if beta <= alpha:  # Alpha cut-off
+                break
+    return best_value, best_cell
@@ -0,0 +1,260 @@
+"""Asyncio move server: best moves for many clients at once.
+
+    python -m engine.server --port 8765 --workers 4
+    python -m engine.server --unix /tmp/tictactoe.sock
+
+The protocol is one JSON object per line each way. A request names the
+board as a string of "X", "O" and "." read row by row, its size, and
+optionally the side to move and a deadline:
+
+    {"id": 1, "board": "X...O....", "size": 3, "side": "X", "deadline_ms": 500}
+    {"id": 1, "move": [0, 2], "value": 0, "depth": 7, "source": "search"}
+
+"value" is from X's point of view: 0 for a draw, search.WIN less the plies
+to the win when X wins, and the negation when O does. "rows" and "cols"
+may be given instead of "size". Errors come back as
+{"id": ..., "error": "..."}, and {"op": "stats"} returns the server's
+counters. Searches run on a bounded process pool. Positions are reduced
+to their canonical symmetric image, so identical (and mirrored) requests
+that arrive while one is being searched wait for that search instead of
+starting another, and every answer goes into a cache shared by all
+connections. When too many searches are queued, new ones are refused
+with "busy". A request that can't be answered by its deadline gets
+"deadline exceeded", though its search still finishes and fills the cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard, negamax, symmetry, tablebase
+from .transposition import TranspositionTable
+
+MARKS = {"X": "X", "O": "O", ".": None}
+
+class ServerBusy(Exception):
+    """Raised when a new search would exceed the pending-search limit."""
+
+# Set in each worker process by _init_worker
+_TABLE = None
+
+def _init_worker():
+    global _TABLE
+    _TABLE = TranspositionTable()
+
+def _search(board, time_limit):
+    """Finds the best move in a worker process; returns (value, move bit, depth).
+
+    Drawn positions of a solved size are looked up; the rest are searched,
+    so a won position gets its fastest win.
+    """
+    x, o, rows, cols = board
+    is_maximizing = bitboard.player(board) == "X"
+    book = tablebase.load(rows, cols)
+    drawing = book.drawing_move(board) if book is not None else None
+    if drawing is not None:
+        value, (i, j) = 0, drawing
+        depth = rows * cols - (x | o).bit_count()
+    else:
+        value, (i, j), depth = negamax.iterative_deepening(board, is_maximizing, _TABLE, time_limit)
+    return value, 1 << (i * cols + j), depth
+
+def parse_board(request):
+    """Builds the bitboard a request describes; raises ValueError if it is malformed."""
+    text = request.get("board")
+    if not isinstance(text, str):
+        raise ValueError("board must be a string of X, O and .")
+    if "size" in request:
+        rows = cols = request["size"]
+    else:
+        rows, cols = request.get("rows"), request.get("cols")
+    if not isinstance(rows, int) or not isinstance(cols, int) or rows < 1 or cols < 1 or len(text) != rows * cols:
+        raise ValueError("board length doesn't match the size")
+    if any(c not in MARKS for c in text):
+        raise ValueError("board must be a string of X, O and .")
+    board = bitboard.from_lists([[MARKS[c] for c in text[i * cols:(i + 1) * cols]] for i in range(rows)])
+    x, o, _, _ = board
+    if x.bit_count() - o.bit_count() not in (0, 1):
+        raise ValueError("not a reachable position")
+    if "side" in request and request["side"] != bitboard.player(board):
+        raise ValueError(f"it is {bitboard.player(board)}'s turn")
+    if bitboard.terminal(board):
+        raise ValueError("game over")
+    return board
+
+class MoveServer:
+    """Answers move requests from any number of connections.
+
+    workers processes search at most max_pending distinct positions at a
+    time (queued or running); cache_size answers are kept, least recently
+    used dropped first. Each search may take up to time_limit seconds,
+    whatever the request's deadline, and deadline_ms is the default
+    deadline. Each connection may have max_in_flight requests being
+    answered; beyond that it isn't read, so TCP pushes back.
+    """
+
+    def __init__(self, workers=None, max_pending=64, cache_size=100_000, time_limit=0.5, deadline_ms=2000,
+                 max_in_flight=16):
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker)
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.time_limit = time_limit
+        self.deadline_ms = deadline_ms
+        self.max_in_flight = max_in_flight
+        self.cache = OrderedDict()  # Canonical board -> (value, move bit, depth)
+        self.searching = {}  # Canonical board -> future of its search
+        self.stats = dict.fromkeys(("requests", "searches", "cache_hits", "coalesced", "busy", "timeouts",
+                                    "errors"), 0)
+
+    async def best_move(self, board, deadline):
+        """Returns (value, (row, col), depth, source) for board.
+
+        Raises ServerBusy, or asyncio.TimeoutError once deadline (a
+        time.monotonic() value) passes.
+        """
+        x, o, rows, cols = board
+        canon, idx = symmetry.canonical(board)
+        source = "cache"
+        if canon in self.cache:
+            self.cache.move_to_end(canon)
+            self.stats["cache_hits"] += 1
+            value, bit, depth = self.cache[canon]
+        else:
+            future = self.searching.get(canon)
+            if future is not None:
+                source = "coalesced"
+                self.stats["coalesced"] += 1
+            else:
+                if len(self.searching) >= self.max_pending:
+                    self.stats["busy"] += 1
+                    raise ServerBusy
+                source = "search"
+                self.stats["searches"] += 1
+                # Every search gets the full time limit, so the cache and joined requests never get a
+                # shallower answer because one client was in a hurry; the deadline only bounds the wait
+                future = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(
+                    self.pool, _search, canon, self.time_limit))
+                self.searching[canon] = future
+                future.add_done_callback(lambda f: self._finished(canon, f))
+            remaining = deadline - time.monotonic()
+            try:
+                value, bit, depth = await asyncio.wait_for(asyncio.shield(future), max(0.0, remaining))
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise
+        idx_bit = symmetry.inverse_maps(rows, cols)[idx][bit]  # Back from the canonical image
+        cell = idx_bit.bit_length() - 1
+        return value, (cell // cols, cell % cols), depth, source
+
+    def _finished(self, canon, future):
+        del self.searching[canon]
+        if not future.cancelled() and future.exception() is None:
+            self.cache[canon] = future.result()
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    async def answer(self, request):
+        """Returns the response to one decoded request."""
+        if not isinstance(request, dict):
+            return {"error": "request must be a JSON object"}
+        if request.get("op") == "stats":
+            return dict(self.stats, cached=len(self.cache), searching=len(self.searching), id=request.get("id"))
+        self.stats["requests"] += 1
+        response = {"id": request.get("id")}
+        started = time.monotonic()
+        deadline_ms = request.get("deadline_ms", self.deadline_ms)
+        try:
+            if not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+                raise ValueError("deadline_ms must be a positive number")
+            board = parse_board(request)
+            value, move, depth, source = await self.best_move(board, started + deadline_ms / 1000)
+        except ValueError as e:
+            self.stats["errors"] += 1
+            response["error"] = str(e)
+        except asyncio.TimeoutError:
+            response["error"] = "deadline exceeded"
+        except ServerBusy:
+            response["error"] = "busy"
+        except Exception as e:  # A broken worker pool, say; the connection stays up
+            self.stats["errors"] += 1
+            response["error"] = f"internal error: {e!r}"
+        else:
+            response.update(move=list(move), value=value, depth=depth, source=source)
+        return response
+
+    async def handle(self, reader, writer):
+        """Serves one connection; requests are answered concurrently, possibly out of order."""
+        slots = asyncio.Semaphore(self.max_in_flight)
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"error": "invalid JSON"}
+                else:
+                    response = await self.answer(request)
+                async with lock:
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    await writer.drain()
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                await slots.acquire()  # Stop reading while this connection has too much in flight
+                line = await reader.readline()
+                if not line:
+                    slots.release()
+                    break
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, ValueError):  # Dropped connection or an over-long line
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        """Shuts the process pool down."""
+        self.pool.shutdown(cancel_futures=True)
+
+async def serve(host="127.0.0.1", port=8765, unix=None, **options):
+    """Runs a MoveServer until cancelled; options are passed to MoveServer."""
+    server = MoveServer(**options)
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Tic-Tac-Toe moves over TCP or a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, help="search processes (default: all cores)")
+    parser.add_argument("--max-pending", type=int, default=64, help="searches queued before refusing with busy")
+    parser.add_argument("--cache-size", type=int, default=100_000, help="answers kept in the shared cache")
+    parser.add_argument("--time-limit", type=float, default=0.5, help="most seconds one search may take")
+    parser.add_argument("--deadline-ms", type=int, default=2000, help="deadline of requests that don't set one")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers, max_pending=args.max_pending,
+                          cache_size=args.cache_size, time_limit=args.time_limit, deadline_ms=args.deadline_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Counters that a search fills in when it is given a SearchStats object."""
+import logging
+
+log = logging.getLogger("engine.search")
+
+class SearchStats:
+    """What a search did: nodes, cut-offs, table use, branching and timing.
+
+    Searches only touch these counters when a SearchStats is passed in, so
+    leaving it out costs a single flag check per node. Calling a search
+    again with the same object adds to the counts; iterative deepening does
+    this for each depth.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.beta_cutoffs = 0  # X (maximizing) found a move too good for O to allow
+        self.alpha_cutoffs = 0  # O (minimizing) found a move too good for X to allow
+        self.table_cutoffs = 0  # Nodes answered straight from the transposition table
+        self.draw_cutoffs = 0  # Nodes cut short because a side could no longer win
+        self.table_probes = 0
+        self.table_hits = 0
+        self.book_hits = 0  # Moves taken from an opening book instead of searched
+        self.ply_nodes = []  # Nodes visited at each distance from the root
+        self.root_times = {}  # (row, col) -> seconds spent searching that root move
+        self.elapsed = 0.0
+        self.depth = 0
+
+    def branching_factors(self):
+        """Returns the average number of children searched per node at each ply."""
+        return [b / a for a, b in zip(self.ply_nodes, self.ply_nodes[1:]) if a and b]
+
+    def nodes_per_second(self):
+        """Returns the search speed."""
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        """Returns the counters as a plain dict, e.g. for JSON output."""
+        return {
+            "nodes": self.nodes,
+            "beta_cutoffs": self.beta_cutoffs,
+            "alpha_cutoffs": self.alpha_cutoffs,
+            "table_cutoffs": self.table_cutoffs,
+            "draw_cutoffs": self.draw_cutoffs,
+            "table_probes": self.table_probes,
+            "table_hits": self.table_hits,
+            "book_hits": self.book_hits,
+            "branching_factors": [round(b, 2) for b in self.branching_factors()],
+            "root_times": {f"{i},{j}": round(t, 4) for (i, j), t in self.root_times.items()},
+            "elapsed": round(self.elapsed, 4),
+            "nodes_per_second": round(self.nodes_per_second()),
+            "depth": self.depth,
+        }
+
+    def summary(self):
+        """Returns a few short lines describing the search, for logs and the overlay."""
+        lines = [
+            f"Nodes: {self.nodes:,} in {self.elapsed:.2f}s ({self.nodes_per_second() / 1000:.0f}k/s)",
+            f"Depth: {self.depth}",
+            f"Cutoffs: beta {self.beta_cutoffs:,}, alpha {self.alpha_cutoffs:,}, table {self.table_cutoffs:,}, "
+            f"draw {self.draw_cutoffs:,}",
+            f"Table: {self.table_hits:,} hits / {self.table_probes:,} probes",
+            "Branching: " + " ".join(f"{b:.1f}" for b in self.branching_factors()[:8]),
+        ]
+        if self.book_hits:
+            lines.append(f"Book hits: {self.book_hits:,}")
+        slowest = sorted(self.root_times.items(), key=lambda item: -item[1])[:3]
+        if slowest:
+            lines.append("Root: " + ", ".join(f"{i},{j} {t:.2f}s" for (i, j), t in slowest))
+        return lines
+
+def log_stats(stats):
+    """Logs a finished search at DEBUG level on the "engine.search" logger."""
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("search finished: %s", " | ".join(stats.summary()))
@@ -0,0 +1,112 @@
+"""Rotations and reflections of the board, used to share work between symmetric positions."""
+from .transposition import zobrist_keys
+
+_MAPS = {}
+_KEYS = {}
+
+def bit_maps(rows, cols):
+    """Returns one dict per board symmetry mapping each square's bit to its image.
+
+    Square boards have the 8 symmetries of the dihedral group, other boards
+    only 4. The identity always comes first.
+    """
+    size = (rows, cols)
+    if size not in _MAPS:
+        cells = [(i, j) for i in range(rows) for j in range(cols)]
+        moves = [lambda i, j: (i, j),
+                 lambda i, j: (rows - 1 - i, cols - 1 - j),  # Rotate 180
+                 lambda i, j: (i, cols - 1 - j),  # Mirror left-right
+                 lambda i, j: (rows - 1 - i, j)]  # Mirror top-bottom
+        if rows == cols:
+            n = rows
+            moves += [lambda i, j: (j, n - 1 - i),  # Rotate 90
+                      lambda i, j: (n - 1 - j, i),  # Rotate 270
+                      lambda i, j: (j, i),  # Main diagonal
+                      lambda i, j: (n - 1 - j, n - 1 - i)]  # Anti-diagonal
+        maps = []
+        for move in moves:
+            bit_map = {}
+            for i, j in cells:
+                ti, tj = move(i, j)
+                bit_map[1 << (i * cols + j)] = 1 << (ti * cols + tj)
+            maps.append(bit_map)
+        _MAPS[size] = maps
+    return _MAPS[size]
+
+def inverse_maps(rows, cols):
+    """Returns the inverse of each map from bit_maps, in the same order."""
+    return [{v: k for k, v in bit_map.items()} for bit_map in bit_maps(rows, cols)]
+
+def transform(bits, bit_map):
+    """Applies a symmetry to a bitmask."""
+    out = 0
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        out |= bit_map[bit]
+    return out
+
+def canonical(board):
+    """Returns (canonical board, index of the symmetry that produces it).
+
+    The canonical board is the smallest (x, o) image, so every symmetric
+    position maps to the same one.
+    """
+    x, o, rows, cols = board
+    best = None
+    for idx, bit_map in enumerate(bit_maps(rows, cols)):
+        image = (transform(x, bit_map), transform(o, bit_map))
+        if best is None or image < best[0]:
+            best = (image, idx)
+    (cx, co), idx = best
+    return (cx, co, rows, cols), idx
+
+def stabilizer(board):
+    """Returns the symmetries (other than the identity) that leave the board unchanged."""
+    x, o, rows, cols = board
+    return [bit_map for bit_map in bit_maps(rows, cols)[1:]
+            if transform(x, bit_map) == x and transform(o, bit_map) == o]
+
+def unique_moves(board):
+    """Returns the legal moves with symmetric duplicates removed."""
+    x, o, rows, cols = board
+    same = stabilizer(board)
+    empty = ((1 << (rows * cols)) - 1) & ~(x | o)
+    seen = 0
+    moves = []
+    while empty:
+        bit = empty & -empty
+        empty ^= bit
+        if bit & seen:
+            continue
+        for bit_map in same:
+            seen |= bit_map[bit]
+        idx = bit.bit_length() - 1
+        moves.append((idx // cols, idx % cols))
+    return moves
+
+def symmetric_keys(rows, cols):
+    """Returns (x_keys, o_keys) mapping each bit to its Zobrist key under every symmetry.
+
+    XOR-ing these tuples into a position's keys as moves are made keeps the
+    hash of all symmetric images up to date; the smallest is the canonical key.
+    """
+    size = (rows, cols)
+    if size not in _KEYS:
+        x_keys, o_keys = zobrist_keys(rows, cols)
+        maps = bit_maps(rows, cols)
+        _KEYS[size] = ({bit: tuple(x_keys[m[bit]] for m in maps) for bit in x_keys},
+                       {bit: tuple(o_keys[m[bit]] for m in maps) for bit in o_keys})
+    return _KEYS[size]
+
+def position_keys(board):
+    """Computes the Zobrist key of every symmetric image of the board."""
+    x, o, rows, cols = board
+    x_sym, o_sym = symmetric_keys(rows, cols)
+    keys = [0] * len(bit_maps(rows, cols))
+    for bits, sym in ((x, x_sym), (o, o_sym)):
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            keys = [k ^ s for k, s in zip(keys, sym[bit])]
+    return tuple(keys)
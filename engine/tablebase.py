@@ -0,0 +1,170 @@
+"""Perfect-play tablebases for the small boards, built offline and read with mmap.
+
+Every position is ranked as a base-3 number (0 = empty, 1 = X, 2 = O per
+square, square i * cols + j being digit i * cols + j), and its game value is
+stored in 2 bits at that rank: 1 = X wins, 2 = draw, 3 = O wins, 0 = not
+reachable. The best move is found by looking up each child, so an AI move
+costs at most one lookup per square instead of a search.
+
+Build the files with:  python -m engine.tablebase 3 4
+"""
+import mmap
+import os
+import sys
+import time
+
+from . import bitboard
+
+MAGIC = b"TTTB"
+X_WINS, DRAW, O_WINS = 1, 2, 3
+VALUES = {X_WINS: 1, DRAW: 0, O_WINS: -1}
+
+_LOADED = {}
+
+def path_for(rows, cols):
+    """Returns the file the tablebase for this size is stored in."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"tablebase_{rows}x{cols}.bin")
+
+def _rank_tables(n):
+    """Per 8-square chunk, maps a byte of a bitmask to its base-3 contribution."""
+    tables = []
+    for chunk in range(0, n, 8):
+        tables.append([sum(3 ** (chunk + b) for b in range(8) if byte >> b & 1) for byte in range(256)])
+    return tables
+
+def rank(x, o, tables):
+    """Returns the base-3 rank of the position with marks x and o."""
+    r = 0
+    for chunk, table in enumerate(tables):
+        r += table[x >> (8 * chunk) & 255] + 2 * table[o >> (8 * chunk) & 255]
+    return r
+
+def build(rows, cols, path=None):
+    """Solves every reachable position by retrograde analysis and writes the file.
+
+    The reachable positions are enumerated ply by ply, then valued from the
+    last ply back to the first: each position takes the best of its
+    children's values, which are always one ply later and already known.
+    """
+    n = rows * cols
+    lines = bitboard.tables(rows, cols)[1]
+    pow3 = [3 ** idx for idx in range(n)]
+    tables = _rank_tables(n)
+    full = (1 << n) - 1
+    codes = bytearray(3 ** n)
+
+    # Forward: non-terminal positions per ply, stored as x | o << n.
+    # Children that end the game are valued right away.
+    layers = [[0]]
+    for ply in range(n):
+        x_moves = ply % 2 == 0
+        code = X_WINS if x_moves else O_WINS
+        following = set()
+        for key in layers[-1]:
+            x, o = key & full, key >> n
+            base = rank(x, o, tables)
+            mine = x if x_moves else o
+            empty = full & ~(x | o)
+            while empty:
+                bit = empty & -empty
+                empty ^= bit
+                placed = mine | bit
+                for mask in lines[bit]:
+                    if placed & mask == mask:
+                        codes[base + (1 if x_moves else 2) * pow3[bit.bit_length() - 1]] = code
+                        break
+                else:
+                    if ply == n - 1:
+                        codes[base + (1 if x_moves else 2) * pow3[bit.bit_length() - 1]] = DRAW
+                    elif x_moves:
+                        following.add(placed | o << n)
+                    else:
+                        following.add(x | placed << n)
+        if ply < n - 1:
+            layers.append(sorted(following))
+
+    # Backward: X picks the smallest code (1 = X wins), O the largest
+    for ply in range(len(layers) - 1, -1, -1):
+        x_moves = ply % 2 == 0
+        digit = 1 if x_moves else 2
+        for key in layers[ply]:
+            x, o = key & full, key >> n
+            base = rank(x, o, tables)
+            empty = full & ~(x | o)
+            children = []
+            while empty:
+                bit = empty & -empty
+                empty ^= bit
+                children.append(codes[base + digit * pow3[bit.bit_length() - 1]])
+            codes[base] = min(children) if x_moves else max(children)
+        layers[ply] = None  # Free each ply once it is valued
+
+    packed = bytearray((len(codes) + 3) // 4)
+    for idx, code in enumerate(codes):
+        if code:
+            packed[idx >> 2] |= code << ((idx & 3) * 2)
+    with open(path or path_for(rows, cols), "wb") as f:
+        f.write(MAGIC + bytes([rows, cols]))
+        f.write(packed)
+
+class Tablebase:
+    """A memory-mapped tablebase file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != MAGIC:
+            raise ValueError(f"Not a tablebase file: {path}")
+        self.rows, self.cols = self.data[4], self.data[5]
+        self.tables = _rank_tables(self.rows * self.cols)
+        self.pow3 = [3 ** idx for idx in range(self.rows * self.cols)]
+
+    def _code(self, r):
+        return self.data[6 + (r >> 2)] >> ((r & 3) * 2) & 3
+
+    def value(self, board):
+        """Returns the game value of board (1, 0 or -1), or None if it is unreachable."""
+        x, o, _, _ = board
+        code = self._code(rank(x, o, self.tables))
+        return VALUES[code] if code else None
+
+    def best_move(self, board):
+        """Returns (value, (row, col)) for the side to move, like search.minimax."""
+        x, o, rows, cols = board
+        base = rank(x, o, self.tables)
+        x_moves = x.bit_count() == o.bit_count()
+        digit = 1 if x_moves else 2
+        best = None
+        for idx in range(rows * cols):
+            if (x | o) >> idx & 1:
+                continue
+            code = self._code(base + digit * self.pow3[idx])
+            if code and (best is None or (code < best[0] if x_moves else code > best[0])):
+                best = (code, idx)
+        if best is None:
+            return VALUES.get(self._code(base), 0), None
+        return VALUES[best[0]], (best[1] // cols, best[1] % cols)
+
+    def drawing_move(self, board):
+        """Returns a move (row, col) that holds a drawn position, or None if board isn't a draw.
+
+        The tablebase doesn't know how far off a win is, so won and lost
+        positions are left to a search, which plays the fastest win.
+        """
+        if self.value(board) != 0:
+            return None
+        return self.best_move(board)[1]
+
+def load(rows, cols):
+    """Returns the tablebase for this size, or None if it hasn't been built."""
+    size = (rows, cols)
+    if size not in _LOADED:
+        path = path_for(rows, cols)
+        _LOADED[size] = Tablebase(path) if os.path.exists(path) else None
+    return _LOADED[size]
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ["3", "4"]:
+        start = time.perf_counter()
+        build(int(arg), int(arg))
+        print(f"{arg}x{arg}: {path_for(int(arg), int(arg))} in {time.perf_counter() - start:.1f}s")
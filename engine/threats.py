@@ -0,0 +1,56 @@
+"""Line checks on bitboards: immediate wins, forced blocks, double threats and dead lines.
+
+A line threatens when one side holds every square of it but one and the
+other side holds none. Checking every line's counts this way takes
+O(lines) per position and tells the search when it need not look at
+every move:
+
+- the side to move has a threat: it wins at once;
+- the opponent has two threats on different squares: one can't block both, so it loses;
+- the opponent has one threat: the only move worth searching is the block.
+
+A line that holds both marks is dead. Once every line is dead the game is
+a draw, however many squares are left, and a side that needs more squares
+on every line it can still complete than it has moves left can't win
+either. The search keeps its set of open lines as a bitmask over the line
+masks, clearing a line's bit when a move makes it dead.
+"""
+import math
+
+def completing(own, other, masks):
+    """Returns the squares where own would complete a line other hasn't blocked, as a bitmask."""
+    squares = 0
+    for mask in masks:
+        if not other & mask:
+            rest = mask & ~own
+            if not rest & (rest - 1):  # A single square left
+                squares |= rest
+    return squares
+
+def line_bits(masks):
+    """Maps each win mask to its bit (1 << its index) in a set of lines."""
+    return {mask: 1 << i for i, mask in enumerate(masks)}
+
+def open_lines(x, o, masks):
+    """Returns the set of lines, as bits, that don't hold both marks and so can still be won."""
+    live = 0
+    for i, mask in enumerate(masks):
+        if not (x & mask and o & mask):
+            live |= 1 << i
+    return live
+
+def needs(own, other, masks, live):
+    """Returns (own's, other's) fewest squares still missing from a line in live; math.inf if none is left."""
+    own_need = other_need = math.inf
+    while live:
+        line = live & -live
+        live ^= line
+        mask = masks[line.bit_length() - 1]
+        if own & mask:
+            own_need = min(own_need, (mask & ~own).bit_count())
+        elif other & mask:
+            other_need = min(other_need, (mask & ~other).bit_count())
+        else:
+            own_need = min(own_need, mask.bit_count())
+            other_need = min(other_need, mask.bit_count())
+    return own_need, other_need
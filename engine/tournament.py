@@ -0,0 +1,234 @@
+"""Headless engine-vs-engine tournaments, played on every core.
+
+    python -m engine.tournament --size 3 --players minimax alphabeta random --games 1000
+    python -m engine.tournament --size 4 --players search depth2 iterative:0.1 random --output games.jsonl
+
+Each pair of players meets for --games games, swapping X and O each game.
+The first --opening-plies moves are random (seeded per game) so
+deterministic engines don't replay the same game every time. Finished
+games are appended to the JSONL output as they arrive, with their moves,
+time per move and nodes per move. Only a bounded number of games is in
+flight at once and only the per-player totals are kept, so memory stays
+flat however many games are played. At the end the win/draw/loss table and
+Elo ratings are printed.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import bitboard, mcts, search, searchstate
+from .searchstate import CountingState
+from .transposition import TranspositionTable
+
+class RandomPlayer:
+    """Plays a random legal move."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def move(self, board):
+        return self.rng.choice(bitboard.actions(board)), 0
+
+class StatePlayer:
+    """Plays with one of the SearchState searches (minimax.py / 4x4_minimax.py)."""
+
+    def __init__(self, search_fn):
+        self.search_fn = search_fn
+
+    def move(self, board):
+        s = CountingState.from_lists(bitboard.to_lists(board))
+        _, move = self.search_fn(s, bitboard.player(board) == "X")
+        return move, s.nodes + 1
+
+class SearchPlayer:
+    """Plays with search.minimax, optionally depth-limited, keeping its table for the game."""
+
+    def __init__(self, depth=None):
+        self.depth = depth
+        self.table = TranspositionTable()
+
+    def move(self, board):
+        progress = {"nodes": 0}
+        depth = self.depth if self.depth is not None else float("inf")
+        _, move = search.minimax(board, bitboard.player(board) == "X", self.table, depth=depth, progress=progress)
+        return move, progress["nodes"]
+
+class IterativePlayer:
+    """Plays with search.iterative_deepening under a time limit."""
+
+    def __init__(self, time_limit):
+        self.time_limit = time_limit
+        self.table = TranspositionTable()
+
+    def move(self, board):
+        progress = {"nodes": 0, "depth": 0, "move": None}
+        _, move, _ = search.iterative_deepening(board, bitboard.player(board) == "X", self.table,
+                                                self.time_limit, progress=progress)
+        return move, progress["nodes"]
+
+class MCTSPlayer:
+    """Plays with Monte Carlo tree search, keeping its tree for the game."""
+
+    def __init__(self, time_limit, rng):
+        self.time_limit = time_limit
+        self.tree = mcts.Tree(seed=rng.getrandbits(32))
+
+    def move(self, board):
+        progress = {"nodes": 0}
+        _, move = self.tree.search(board, self.time_limit, progress=progress)
+        return move, progress["nodes"]
+
+def make_player(name, rng):
+    """Builds a player from its name: random, minimax, alphabeta, search, depthN, iterative[:s] or mcts[:s]."""
+    kind, _, arg = name.partition(":")
+    if kind == "random":
+        return RandomPlayer(rng)
+    if kind == "minimax":
+        return StatePlayer(searchstate.minimax)
+    if kind == "alphabeta":
+        return StatePlayer(searchstate.alphabeta)
+    if kind == "search":
+        return SearchPlayer()
+    if kind.startswith("depth") and kind[5:].isdigit():
+        return SearchPlayer(int(kind[5:]))
+    if kind == "iterative":
+        return IterativePlayer(float(arg) if arg else 0.5)
+    if kind == "mcts":
+        return MCTSPlayer(float(arg) if arg else 0.5, rng)
+    raise ValueError(f"Unknown player: {name}")
+
+def play_game(game_id, size, x_name, o_name, seed, opening_plies):
+    """Plays one game and returns its record."""
+    rng = random.Random(seed)
+    players = {"X": make_player(x_name, rng), "O": make_player(o_name, rng)}
+    board = bitboard.initial_state(size, size)
+    moves, times, nodes = [], [], []
+    while not bitboard.terminal(board):
+        turn = bitboard.player(board)
+        start = time.perf_counter()
+        if len(moves) < opening_plies:
+            move, count = rng.choice(bitboard.actions(board)), 0
+        else:
+            move, count = players[turn].move(board)
+        times.append(round(time.perf_counter() - start, 6))
+        nodes.append(count)
+        moves.append(list(move))
+        board = bitboard.result(board, move)
+    winner = bitboard.check_winner(board)
+    return {
+        "game": game_id,
+        "size": size,
+        "x": x_name,
+        "o": o_name,
+        "seed": seed,
+        "moves": moves,
+        "times": times,
+        "nodes": nodes,
+        "result": winner or "draw",
+    }
+
+def schedule(players, games, size, seed, opening_plies):
+    """Yields the arguments of every game, one at a time."""
+    game_id = 0
+    for a, b in itertools.combinations(players, 2):
+        for n in range(games):
+            x_name, o_name = (a, b) if n % 2 == 0 else (b, a)
+            yield (game_id, size, x_name, o_name, seed + game_id, opening_plies)
+            game_id += 1
+
+def elo(scores, iterations=200):
+    """Fits Elo ratings to pairwise results; scores maps (a, b) -> [points of a, games].
+
+    Ratings are centred on 1500.
+    """
+    players = sorted({p for pair in scores for p in pair})
+    ratings = dict.fromkeys(players, 0.0)
+    for _ in range(iterations):
+        for p in players:
+            actual = expected = games = 0.0
+            for (a, b), (points, n) in scores.items():
+                if p not in (a, b):
+                    continue
+                other = b if p == a else a
+                actual += points if p == a else n - points
+                expected += n / (1 + 10 ** ((ratings[other] - ratings[p]) / 400))
+                games += n
+            if games:
+                ratings[p] += 400 * (actual - expected) / games
+    mean = sum(ratings.values()) / len(ratings)
+    return {p: round(1500 + r - mean) for p, r in ratings.items()}
+
+def run(players, games, size, output=None, workers=None, seed=0, opening_plies=2):
+    """Plays the tournament, streaming records to output; returns (table, ratings).
+
+    table maps each player to its [wins, draws, losses].
+    """
+    table = {p: [0, 0, 0] for p in players}
+    scores = {}
+    out = open(output, "a") if output else None
+    workers = workers or os.cpu_count()
+    tasks = schedule(players, games, size, seed, opening_plies)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            while True:
+                # Keep a couple of games queued per worker, never the whole schedule
+                for args in itertools.islice(tasks, 2 * workers - len(pending)):
+                    pending.add(pool.submit(play_game, *args))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    if out:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                    x, o = record["x"], record["o"]
+                    pair = tuple(sorted((x, o)))
+                    points = scores.setdefault(pair, [0.0, 0])
+                    points[1] += 1
+                    if record["result"] == "draw":
+                        table[x][1] += 1
+                        table[o][1] += 1
+                        points[0] += 0.5
+                    else:
+                        winner, loser = (x, o) if record["result"] == "X" else (o, x)
+                        table[winner][0] += 1
+                        table[loser][2] += 1
+                        points[0] += winner == pair[0]
+    finally:
+        if out:
+            out.close()
+    return table, elo(scores)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine Tic-Tac-Toe tournaments.")
+    parser.add_argument("--size", type=int, default=3, help="board size")
+    parser.add_argument("--players", nargs="+", required=True,
+                        help="random, minimax, alphabeta, search, depthN, iterative[:seconds], mcts[:seconds]")
+    parser.add_argument("--games", type=int, default=100, help="games per pair of players")
+    parser.add_argument("--output", help="JSONL file the games are appended to")
+    parser.add_argument("--workers", type=int, help="processes to use (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=2, help="random moves at the start of each game")
+    args = parser.parse_args(argv)
+
+    for name in args.players:
+        make_player(name, random.Random())  # Fail early on a bad name
+    if len(args.players) < 2:
+        sys.exit("Need at least two players")
+
+    table, ratings = run(args.players, args.games, args.size, args.output, args.workers, args.seed,
+                         args.opening_plies)
+    print(f"{'player':<16} {'elo':>5} {'win':>6} {'draw':>6} {'loss':>6}")
+    for name in sorted(args.players, key=lambda p: -ratings.get(p, 1500)):
+        wins, draws, losses = table[name]
+        print(f"{name:<16} {ratings.get(name, 1500):>5} {wins:>6} {draws:>6} {losses:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Zobrist hashing and a fixed-size transposition table for the bitboard search."""
+import random
+
+# Bound types stored with each value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+_KEYS = {}
+
+def zobrist_keys(rows, cols):
+    """Returns (x_keys, o_keys): a random 64-bit key for each square's bit and mark.
+
+    The side to move follows from the number of marks, so it needs no key.
+    """
+    size = (rows, cols)
+    if size not in _KEYS:
+        rng = random.Random(rows * 1000 + cols)  # Same keys on every run
+        x_keys = {1 << idx: rng.getrandbits(64) for idx in range(rows * cols)}
+        o_keys = {1 << idx: rng.getrandbits(64) for idx in range(rows * cols)}
+        _KEYS[size] = (x_keys, o_keys)
+    return _KEYS[size]
+
+def zobrist_hash(board):
+    """Computes the hash of a bitboard from scratch."""
+    x, o, rows, cols = board
+    x_keys, o_keys = zobrist_keys(rows, cols)
+    key = 0
+    for bit, k in x_keys.items():
+        if x & bit:
+            key ^= k
+    for bit, k in o_keys.items():
+        if o & bit:
+            key ^= k
+    return key
+
+class TranspositionTable:
+    """Fixed number of slots indexed by the low bits of the Zobrist key.
+
+    Each slot holds (key, depth, value, flag, best_bit). With the "depth"
+    policy a slot is only overwritten by an entry searched at least as deep
+    (or by the same position); with "always" the newest entry wins.
+    """
+
+    def __init__(self, max_entries=1 << 18, replacement="depth"):
+        if replacement not in ("depth", "always"):
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        size = 1
+        while size * 2 <= max_entries:
+            size *= 2
+        self.mask = size - 1
+        self.replacement = replacement
+        self.slots = [None] * size
+
+    def __len__(self):
+        return sum(slot is not None for slot in self.slots)
+
+    def probe(self, key):
+        """Returns the entry stored for key, or None."""
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, value, flag, best_bit):
+        """Stores a search result, following the replacement policy."""
+        idx = key & self.mask
+        old = self.slots[idx]
+        if old is None or self.replacement == "always" or old[0] == key or depth >= old[1]:
+            self.slots[idx] = (key, depth, value, flag, best_bit)
+
+    def clear(self):
+        """Empties every slot."""
+        self.slots = [None] * (self.mask + 1)
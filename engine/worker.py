@@ -0,0 +1,115 @@
+"""Runs the AI search on a background thread so the game window keeps responding."""
+import logging
+import threading
+
+from . import board, search
+from .stats import SearchStats
+
+log = logging.getLogger("engine.worker")
+
+class SearchWorker:
+    """Searches one position on a daemon thread and reports the move through on_done.
+
+    A thread (rather than a process) lets the search keep using the game's
+    transposition table. The search checks the stop flag every 1024 nodes,
+    so cancel() returns control almost at once; on_done is not called for a
+    cancelled search. search_fn is any search with the arguments and result
+    of search.iterative_deepening, such as mnk.iterative_deepening. If it
+    raises, the error is logged and on_done still gets called, with value
+    None and the move and depth of the deepest iteration that finished
+    (None and 0 if none did), so the caller isn't left waiting.
+    """
+
+    def __init__(self, board, is_maximizing, table, time_limit, on_done, search_fn=search.iterative_deepening):
+        self.board = board
+        self.is_maximizing = is_maximizing
+        self.table = table
+        self.time_limit = time_limit
+        self.on_done = on_done
+        self.search_fn = search_fn
+        self.progress = {"nodes": 0, "depth": 0, "move": None}
+        self.stats = SearchStats()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts searching."""
+        self.thread.start()
+
+    def cancel(self):
+        """Asks the search to stop and drops its result."""
+        self.stop.set()
+
+    def running(self):
+        """Returns True while the search thread is alive."""
+        return self.thread.is_alive()
+
+    def _run(self):
+        try:
+            value, move, depth = self.search_fn(self.board, self.is_maximizing, self.table,
+                                                self.time_limit, self.stop, self.progress, self.stats)
+        except Exception:
+            log.exception("search failed")
+            value, move, depth = None, self.progress["move"], self.progress["depth"]
+        if not self.stop.is_set():
+            self.on_done(value, move, depth)
+
+class Ponderer:
+    """Searches the opponent's likely replies on a daemon thread while they think.
+
+    state is the list-of-lists board with the opponent to move and
+    is_maximizing the AI's side. The opponent's reply is first predicted
+    with a short search from their side; then the AI's answer to that reply
+    is searched, then its answer to every other reply, each for time_limit
+    seconds. Finished answers are kept in results, keyed by the board after
+    the reply, and everything searched stays in the shared table, so the AI
+    can answer at once or carry on from the work done. to_board converts a
+    list-of-lists board to what search_fn takes. state is copied, so the
+    game may go on changing its own board. A search that fails ends the
+    pondering; the answers found until then are kept.
+    """
+
+    def __init__(self, state, is_maximizing, table, time_limit, to_board, search_fn=search.iterative_deepening):
+        self.state = [row[:] for row in state]
+        self.is_maximizing = is_maximizing
+        self.table = table
+        self.time_limit = time_limit
+        self.to_board = to_board
+        self.search_fn = search_fn
+        self.results = {}
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Starts pondering."""
+        self.thread.start()
+
+    def cancel(self):
+        """Stops pondering and waits for the thread, so the table is free for the next search."""
+        self.stop.set()
+        self.thread.join()
+
+    def reply(self, state):
+        """Returns the pondered (value, move, depth) for state, or None if it wasn't finished."""
+        return self.results.get(tuple(map(tuple, state)))
+
+    def _run(self):
+        try:
+            self._ponder()
+        except Exception:
+            log.exception("pondering failed")
+
+    def _ponder(self):
+        replies = board.actions(self.state)
+        predicted = self.search_fn(self.to_board(self.state), not self.is_maximizing, self.table,
+                                   self.time_limit / 4, self.stop)[1]
+        if predicted in replies:
+            replies.remove(predicted)
+            replies.insert(0, predicted)
+        for move in replies:
+            if self.stop.is_set():
+                return
+            child = board.result(self.state, move)
+            outcome = self.search_fn(self.to_board(child), self.is_maximizing, self.table, self.time_limit, self.stop)
+            if outcome[1] is not None and not self.stop.is_set():
+                self.results[tuple(map(tuple, child))] = outcome
@@ -1,9 +1,8 @@
 import pygame
 import sys
-import math
 
-# Initialize pygame
-pygame.init()
+from engine import bitboard, search, tablebase
+from engine import initial_state, player, result, terminal
 
 # Screen size and colors
 WIDTH, HEIGHT = 300, 400  # Increased height to accommodate the menu
@@ -25,95 +24,19 @@ TEXT_COLOR = (255, 255, 255)
 BUTTON_COLOR = (70, 70, 70)
 BUTTON_HOVER_COLOR = (100, 100, 100)
 
-# Fonts
-FONT = pygame.font.Font(None, 40)
-MENU_FONT = pygame.font.Font(None, 60)
-
-# Initialize screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Tic-Tac-Toe')
-
-# Functions based on the description
-def initial_state():
-    """Returns the initial state of the board."""
-    return [[None, None, None],
-            [None, None, None],
-            [None, None, None]]
-
-def player(state):
-    """Returns the player (X or O) whose turn it is."""
-    x_count = sum(row.count("X") for row in state)
-    o_count = sum(row.count("O") for row in state)
-    return "X" if x_count == o_count else "O"
-
-def actions(state):
-    """Returns the available legal moves in the current state."""
-    return [(i, j) for i in range(BOARD_ROWS) for j in range(BOARD_COLS) if state[i][j] is None]
-
-def result(state, action):
-    """Returns the new state after taking action."""
-    i, j = action
-    if state[i][j] is not None:
-        raise ValueError("Invalid action")
-
-    new_state = [row[:] for row in state]  # Copy the state
-    new_state[i][j] = player(state)  # Place the current player's mark
-    return new_state
-
-def terminal(state):
-    """Checks if the game has ended (either a win or a draw)."""
-    return check_winner(state) is not None or not any(None in row for row in state)
-
-def check_winner(state):
-    """Returns the winner of the game, if any."""
-    # Check rows
-    for row in state:
-        if row[0] == row[1] == row[2] and row[0] is not None:
-            return row[0]
-    # Check columns
-    for col in range(BOARD_COLS):
-        if state[0][col] == state[1][col] == state[2][col] and state[0][col] is not None:
-            return state[0][col]
-    # Check diagonals
-    if state[0][0] == state[1][1] == state[2][2] and state[0][0] is not None:
-        return state[0][0]
-    if state[0][2] == state[1][1] == state[2][0] and state[0][2] is not None:
-        return state[0][2]
-    return None
-
-def utility(state):
-    """Returns the score of the state (1 if X wins, -1 if O wins, 0 if draw)."""
-    win = check_winner(state)
-    if win == "X":
-        return 1
-    elif win == "O":
-        return -1
-    else:
-        return 0
-
-def minimax(state, is_maximizing):
-    """Minimax algorithm to choose the best move."""
-    if terminal(state):
-        return utility(state), None
-
-    if is_maximizing:
-        best_value = -math.inf
-        best_move = None
-        for action in actions(state):
-            min_result, _ = minimax(result(state, action), False)
-            if min_result > best_value:
-                best_value = min_result
-                best_move = action
-        return best_value, best_move
-    else:
-        best_value = math.inf
-        best_move = None
-        for action in actions(state):
-            max_result, _ = minimax(result(state, action), True)
-            if max_result < best_value:
-                best_value = max_result
-                best_move = action
-        return best_value, best_move
+# Fonts and screen, created by init_display()
+FONT = None
+MENU_FONT = None
+screen = None
+
+def init_display():
+    """Initializes pygame, loads the fonts and opens the window."""
+    global FONT, MENU_FONT, screen
+    pygame.init()
+    FONT = pygame.font.Font(None, 40)
+    MENU_FONT = pygame.font.Font(None, 60)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Tic-Tac-Toe')
 
 # Pygame-specific functions
 def draw_lines():
@@ -241,7 +164,11 @@ def game_loop():
             # AI Move button
             if event.type == pygame.MOUSEBUTTONDOWN and button_clicked() and not game_over:
                 turn = player(state)
-                _, best_move = minimax(state, turn == "X")
+                board = bitboard.from_lists(state)
+                book = tablebase.load(BOARD_ROWS, BOARD_COLS)
+                best_move = book.drawing_move(board) if book is not None else None
+                if best_move is None:  # Not drawn: search for the fastest win
+                    _, best_move = search.minimax(board, turn == "X")
                 state = result(state, best_move)
 
                 draw_figures(state)
@@ -254,4 +181,6 @@ def game_loop():
         pygame.display.update()
 
 # Start the game by launching the main menu
-main_menu()
+if __name__ == "__main__":
+    init_display()
+    main_menu()